@@ -1,33 +1,85 @@
 import argparse
 import asyncio
+import pathlib
+import sys
 
 from loguru import logger
 
+from fazuh.warlock import query
+from fazuh.warlock.config import Config
+from fazuh.warlock.metrics import Metrics
+from fazuh.warlock.notifier import Notifier
+from fazuh.warlock.siak.captcha import CaptchaSolver
+from fazuh.warlock.siak.path import Path
 
-async def main():
+
+def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Warlock Bot")
-    parser.add_argument(
-        "module",
-        choices=["track", "war"],
-        help="Module to run (track or war).",
-    )
-    args = parser.parse_args()
+    modules = parser.add_subparsers(dest="module", required=True, metavar="module")
+    modules.add_parser("track", help="Track changes of the course schedule.")
+    modules.add_parser("war", help="Fill the IRS when registration opens.")
+    modules.add_parser("daemon", help="Run track and war together on one shared login.")
+    query.add_arguments(modules.add_parser("query", help="Look up the tracked schedule, as JSON."))
+    return parser.parse_args()
+
 
+async def main(args: argparse.Namespace):
     logger.add("log/{time}.log", rotation="1 day")
 
-    if args.module == "track":
-        from fazuh.warlock.module.schedule_update_tracker import ScheculeUpdateTracker
+    conf = Config()
+    if not await conf.validate():
+        logger.error("Invalid configuration. See the errors above and .env-example.")
+        sys.exit(1)
+    if conf.siak_hostname:
+        Path.set_hostname(conf.siak_hostname)
+    metrics = Metrics()
+    server = None
+    if conf.metrics_port:
+        server = await metrics.serve(conf.metrics_port)
+
+    notifier = Notifier()
+    notifier.start()
+    try:
+        if args.module == "track":
+            from fazuh.warlock.module.schedule_update_tracker import ScheculeUpdateTracker
+
+            await ScheculeUpdateTracker().start()
+
+        elif args.module == "war":
+            from fazuh.warlock.module.war_bot import WarBot
 
-        await ScheculeUpdateTracker().start()
+            await WarBot().start()
 
-    elif args.module == "war":
-        from fazuh.warlock.module.war_bot import WarBot
+        elif args.module == "daemon":
+            from fazuh.warlock.module.schedule_update_tracker import ScheculeUpdateTracker
+            from fazuh.warlock.module.war_bot import WarBot
+            from fazuh.warlock.siak.session import SiakSession
+            from fazuh.warlock.siak.siak import Siak
 
-        await WarBot().start()
+            # One browser and one login for both modules
+            session = SiakSession(Siak(conf.username, conf.password))
+            try:
+                async with asyncio.TaskGroup() as tasks:
+                    tasks.create_task(WarBot(session).start(), name="war")
+                    tasks.create_task(ScheculeUpdateTracker(session).start(), name="track")
+            finally:
+                await session.siak.close()
+    finally:
+        # Keep undelivered notifications for the next run
+        await notifier.close()
+        await CaptchaSolver().close()
+        if server is not None:
+            server.close()
+        if conf.metrics_file:
+            metrics.dump(pathlib.Path(conf.metrics_file))
 
 
 def main_sync():
-    asyncio.run(main())
+    args = parse_args()
+    if args.module == "query":
+        # Offline and without config, so none of the modules' setup is needed
+        sys.exit(query.run(args))
+    asyncio.run(main(args))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,271 @@
+"""Benchmarks for warlock hot paths.
+
+Run with `python -m fazuh.warlock.bench`. Tracker and war bot benchmarks run against the
+local SIAK stand-in (`fazuh.warlock.standin`), so they never touch the real portal.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+import statistics
+import tempfile
+import time
+from types import MappingProxyType
+from typing import Awaitable
+from typing import Callable
+
+from loguru import logger
+
+from fazuh.warlock.config import Config
+from fazuh.warlock.config import ConfigSnapshot
+from fazuh.warlock.metrics import Metrics
+from fazuh.warlock.notifier import Notifier
+from fazuh.warlock.siak.path import Path as SiakPath
+from fazuh.warlock.siak.schedule_parser import parse_schedule
+from fazuh.warlock.siak.schedule_parser import parse_schedule_soup
+from fazuh.warlock.siak.session import SiakSession
+from fazuh.warlock.siak.siak import Siak
+from fazuh.warlock.standin.pages import schedule_page
+from fazuh.warlock.standin.server import StandInServer
+
+MODES = ("http", "browser")
+# Matches rows of the stand-in CoursePlanEdit page, e.g. "Mata Kuliah 3 (B)" by "Dosen 3-1"
+WAR_COURSES = {f"Mata Kuliah {c}": f"Dosen {c}-{c % 4}" for c in range(0, 35, 5)}
+
+
+def measure(fn: Callable, *args, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def ameasure(fn: Callable[[], Awaitable], repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: list[float]):
+    print(
+        f"{name:<28} min {min(timings) * 1000:9.2f} ms"
+        f"  median {statistics.median(timings) * 1000:9.2f} ms"
+    )
+
+
+def bench_parse(courses: int, classes: int, repeat: int):
+    content = schedule_page(courses, classes)
+    print(f"Schedule page: {courses} courses x {classes} classes, {len(content) / 1e6:.1f} MB")
+
+    if parse_schedule(content) != parse_schedule_soup(content):
+        raise AssertionError("parse_schedule output differs from parse_schedule_soup")
+
+    report("parse_schedule_soup", measure(parse_schedule_soup, content, repeat=repeat))
+    report("parse_schedule", measure(parse_schedule, content, repeat=repeat))
+
+
+def use_standin(server: StandInServer, mode: str):
+    """Point warlock at the stand-in, with a config made for benchmarking in `mode`."""
+    SiakPath.set_hostname(server.url)
+    Config().snapshot = standin_config(
+        server.url, server.username, server.password, server.webhook_url, mode
+    )
+
+
+def standin_config(
+    url: str, username: str, password: str, webhook_url: str, mode: str
+) -> ConfigSnapshot:
+    """A config for the stand-in at `url`, made for benchmarking in `mode`."""
+    return ConfigSnapshot(
+        user_id=None,
+        auth_discord_webhook_url=None,
+        headless=True,
+        browser="chromium",
+        session_file="",
+        siak_hostname=url,
+        block_resources=True,
+        blocked_resource_types=("image", "stylesheet", "font", "media"),
+        allowed_hosts=(),
+        metrics_port=None,
+        metrics_file="",
+        captcha_solvers=("http",),
+        captcha_timeout=60,
+        captcha_port=0,
+        browser_max_rss_mb=0,
+        browser_max_age=0,
+        browser_max_navigations=0,
+        hot_windows=(),
+        hot_interval=5,
+        backoff_max=600,
+        username=username,
+        password=password,
+        tracker_interval=0,
+        tracked_urls=(f"{url}main/Schedule/Index?period=2025-1&search=",),
+        tracker_discord_webhook_urls=(webhook_url,),
+        tracker_fetch_mode=mode,
+        tracker_concurrency=4,
+        warbot_interval=0,
+        warbot_autosubmit=True,
+        warbot_mode=mode,
+        warbot_opens_at=None,
+        warbot_probe_interval=1,
+        warbot_probe_lead=10,
+        warbot_probe_window=900,
+        courses=MappingProxyType(WAR_COURSES),
+    )
+
+
+async def login(siak: Siak, mode: str) -> bool:
+    """Log in like the modules do in `mode`. Only browser mode launches a browser."""
+    if mode == "browser":
+        await siak.start()
+    return await siak.authenticate()
+
+
+async def bench_login(server: StandInServer, repeat: int):
+    use_standin(server, "http")
+
+    async def fresh_login():
+        siak = Siak(server.username, server.password)
+        try:
+            if not await siak.authenticate():
+                raise RuntimeError("login failed")
+        finally:
+            await siak.close()
+
+    report("login http", await ameasure(fresh_login, repeat))
+
+
+async def bench_tracker(server: StandInServer, mode: str, courses: int, classes: int, repeat: int):
+    from fazuh.warlock.module.schedule_update_tracker import ScheculeUpdateTracker
+
+    use_standin(server, mode)
+    revisions = [schedule_page(courses, classes, revision) for revision in (0, 1, 2)]
+    server.schedule = revisions[0]
+
+    tracker = ScheculeUpdateTracker()
+    tracker.fetch_mode = mode
+    tracker.session = SiakSession(Siak(server.username, server.password))
+    tracker.siak = tracker.session.siak
+    try:
+        start = time.perf_counter()
+        if not await login(tracker.siak, mode):
+            raise RuntimeError("login failed")
+        report(f"tracker {mode} login", [time.perf_counter() - start])
+
+        await tracker.run()  # Records the first snapshot
+        report(f"tracker {mode} unchanged", await ameasure(tracker.run, repeat))
+
+        async def changed_cycle():
+            server.schedule = revisions[1 if server.schedule is not revisions[1] else 2]
+            await tracker.run()
+
+        report(f"tracker {mode} changed", await ameasure(changed_cycle, repeat))
+    finally:
+        await tracker.siak.close()
+        for view in tracker.views.values():
+            view.store.close()
+
+
+async def bench_war(server: StandInServer, mode: str, repeat: int):
+    from fazuh.warlock.module.war_bot import WarBot
+
+    use_standin(server, mode)
+    Path("courses.json").write_text(json.dumps(WAR_COURSES))
+
+    bot = WarBot(SiakSession(Siak(server.username, server.password)))
+    bot.siak = bot.session.siak
+    metrics = Metrics()
+    metrics.histograms.pop("time_to_submit", None)
+    try:
+        if not await login(bot.siak, mode):
+            raise RuntimeError("login failed")
+
+        submissions = len(server.submissions)
+        run = bot.run_http if mode == "http" else bot.run
+        report(f"war {mode} fetch to submit", await ameasure(run, repeat))
+        if len(server.submissions) - submissions != repeat:
+            raise AssertionError("the war bot did not submit on every run")
+
+        time_to_submit = metrics.histograms["time_to_submit"]
+        print(
+            f"{f'war {mode} time-to-submit':<28} mean"
+            f" {time_to_submit.sum / time_to_submit.count * 1000:8.2f} ms"
+        )
+    finally:
+        await bot.siak.close()
+
+
+async def bench_standin(args: argparse.Namespace):
+    server = StandInServer(courses=args.courses, classes=args.classes)
+    server.latency = args.latency
+    notifier = Notifier()
+    with server:
+        print(f"SIAK stand-in: {server.url}, {args.latency * 1000:.0f} ms added latency")
+        if "login" in args.suites:
+            await bench_login(server, args.repeat)
+        for mode in args.modes:
+            benches = []
+            if "tracker" in args.suites:
+                tracker = bench_tracker(server, mode, args.courses, args.classes, args.repeat)
+                benches.append(("tracker", tracker))
+            if "war" in args.suites:
+                benches.append(("war", bench_war(server, mode, args.repeat)))
+            for name, bench in benches:
+                try:
+                    await bench
+                except Exception as e:
+                    print(f"{f'{name} {mode}':<28} skipped: {e}")
+        await notifier.close()
+        print(f"Webhook calls: {len(server.webhooks)}, requests served: {server.requests}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warlock benchmarks")
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--classes", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--suites",
+        type=lambda value: value.split(","),
+        default=["parse", "login", "tracker", "war"],
+        help="Comma-separated benchmarks to run: parse, login, tracker, war.",
+    )
+    parser.add_argument(
+        "--modes",
+        type=lambda value: value.split(","),
+        default=list(MODES),
+        help="Comma-separated fetch modes for tracker and war: http, browser.",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds the stand-in adds to each response."
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show warlock logs.")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.remove()
+
+    if "parse" in args.suites:
+        bench_parse(args.courses, args.classes, args.repeat)
+
+    if {"login", "tracker", "war"} & set(args.suites):
+        # The modules keep their state under ./data, so run them in a scratch directory
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as scratch:
+            os.chdir(scratch)
+            try:
+                asyncio.run(bench_standin(args))
+            finally:
+                os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
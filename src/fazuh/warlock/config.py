@@ -1,13 +1,90 @@
+from dataclasses import dataclass
+from datetime import datetime
+import json
 import os
+from pathlib import Path
+import time
+from types import MappingProxyType
+from typing import Mapping
 from typing import Self
 
-from dotenv import load_dotenv
+from dotenv import dotenv_values
+from dotenv import find_dotenv
+import httpx
 from loguru import logger
-import requests
+
+COURSES_FILE = Path("courses.json")
+# How long a webhook that passed validation is trusted before it is checked again
+WEBHOOK_TTL = 3600
+
+
+@dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """One immutable reading of .env and courses.json. See .env-example for the variables."""
+
+    user_id: str | None
+    auth_discord_webhook_url: str | None
+    headless: bool
+    browser: str
+    session_file: str
+    siak_hostname: str | None
+    block_resources: bool
+    blocked_resource_types: tuple[str, ...]
+    allowed_hosts: tuple[str, ...]
+    metrics_port: int | None
+    metrics_file: str
+
+    # CAPTCHA
+    # Names of the solvers to try in order. See `fazuh.warlock.siak.captcha`.
+    captcha_solvers: tuple[str, ...]
+    captcha_timeout: float
+    captcha_port: int
+
+    # Browser health. Limits after which a long-running browser is relaunched. 0 disables.
+    browser_max_rss_mb: int
+    browser_max_age: float
+    browser_max_navigations: int
+
+    # Polling
+    # (start, end) local times during which to poll every hot_interval seconds
+    hot_windows: tuple[tuple[datetime, datetime], ...]
+    hot_interval: float
+    backoff_max: float
+
+    # SiakNG credentials
+    username: str
+    password: str
+
+    # Schedule update tracker
+    tracker_interval: int
+    tracked_urls: tuple[str, ...]
+    tracker_discord_webhook_urls: tuple[str, ...]
+    tracker_fetch_mode: str
+    tracker_concurrency: int
+
+    # War bot
+    warbot_interval: int
+    warbot_autosubmit: bool
+    warbot_mode: str
+    # When registration opens, as a local time. None disables pre-arming.
+    warbot_opens_at: datetime | None
+    warbot_probe_interval: float
+    warbot_probe_lead: float
+    # Seconds after warbot_opens_at to give up probing and retry like without pre-arming
+    warbot_probe_window: float
+    # "course": "prof" entries of courses.json
+    courses: Mapping[str, str]
 
 
 class Config:
+    """The current `ConfigSnapshot`, reloaded when .env or courses.json changes.
+
+    Attributes are read from the current snapshot, e.g. `Config().username`. Code that needs
+    consistent values over a whole iteration should keep the snapshot returned by `refresh`.
+    """
+
     _instance: Self | None = None
+    snapshot: ConfigSnapshot | None = None
 
     def load(self):
         """Load environment variables
@@ -15,51 +92,180 @@ class Config:
         The priority is .env file > environment variables
         See .env-example for the required variables
         """
-        load_dotenv()
-        username = os.getenv("USERNAME")
-        password = os.getenv("PASSWORD")
+        self._mtimes = self._stat()
+        snapshot = self._parse()
+        if snapshot is not None:
+            self.snapshot = snapshot
+
+    async def validate(self) -> bool:
+        """Whether the config of the initial, synchronous load is usable. Checked on startup."""
+        return self.snapshot is not None and await self._validate(self.snapshot)
+
+    async def refresh(self) -> ConfigSnapshot:
+        """Reload the config if .env or courses.json changed since the last load.
+
+        Only the file modification times are checked when nothing changed, so this is cheap
+        to call on every iteration. A changed config is only published once it parses and its
+        webhooks are valid. Otherwise the previous snapshot stays in use, and a config rejected
+        for its webhooks is checked again on the next call.
+        """
+        mtimes = self._stat()
+        if mtimes != self._mtimes:
+            snapshot = self._parse()
+            if snapshot is None:
+                self._mtimes = mtimes  # Invalid until the files are edited again
+            elif await self._validate(snapshot):
+                if self.snapshot is not None:
+                    logger.info("Configuration reloaded.")
+                self.snapshot = snapshot
+                self._mtimes = mtimes
+            # Otherwise a webhook could not be reached, maybe only for now. Retried next time.
+        return self.snapshot
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super(Config, cls).__new__(cls)
+            cls._instance._env_file = Path(find_dotenv() or ".env")
+            cls._instance._webhooks = {}  # URL -> when it was last found valid
+            cls._instance.load()
+        return cls._instance
+
+    def __getattr__(self, name: str):
+        if self.snapshot is None:
+            raise AttributeError(f"Config is not loaded, so {name!r} is unavailable.")
+        return getattr(self.snapshot, name)
+
+    def _parse(self) -> ConfigSnapshot | None:
+        env = {**os.environ, **dotenv_values(self._env_file)}
+        username = env.get("USERNAME")
+        password = env.get("PASSWORD")
         if username is None or password is None:
             logger.error("USERNAME and PASSWORD environment variables are not set.")
-            return
+            return None
 
-        tracker_webhook = os.getenv("TRACKER_DISCORD_WEBHOOK_URL")
-        if tracker_webhook is None or not self._is_webhook_valid(tracker_webhook):
+        tracker_webhooks = self._split(env.get("TRACKER_DISCORD_WEBHOOK_URL", ""))
+        if not tracker_webhooks:
             logger.error("Invalid TRACKER_DISCORD_WEBHOOK_URL.")
-            return
+            return None
 
-        tracked_url = os.getenv("TRACKED_URL")
-        if tracked_url is None:
+        tracked_urls = self._split(env.get("TRACKED_URL", ""))
+        if not tracked_urls:
             logger.error("TRACKED_URL environment variable is not set.")
-            return
+            return None
 
-        self.user_id = os.getenv("USER_ID")
-        self.auth_discord_webhook_url = os.getenv("AUTH_DISCORD_WEBHOOK_URL")
-        self.headless = os.getenv("HEADLESS", "true").lower() in ("true", "1", "yes")
-        self.browser = os.getenv("BROWSER", "chromium").lower()
+        if len(tracker_webhooks) == 1:
+            tracker_webhooks *= len(tracked_urls)
+        elif len(tracker_webhooks) != len(tracked_urls):
+            logger.error("TRACKER_DISCORD_WEBHOOK_URL must be one webhook or one per TRACKED_URL.")
+            return None
 
-        # SiakNG credentials
-        self.username = username
-        self.password = password
+        try:
+            hot_windows = tuple(map(self._window, self._split(env.get("HOT_WINDOWS", ""))))
+        except ValueError as e:
+            logger.error(f"Invalid HOT_WINDOWS: {e}")
+            return None
 
-        # Schedule update tracker
-        self.tracker_interval = int(os.getenv("TRACKER_INTERVAL", 1200))
-        self.tracked_url = tracked_url
-        self.tracker_discord_webhook_url = tracker_webhook
+        try:
+            opens_at = env.get("WARBOT_OPENS_AT")
+            warbot_opens_at = datetime.fromisoformat(opens_at) if opens_at else None
+        except ValueError as e:
+            logger.error(f"Invalid WARBOT_OPENS_AT: {e}")
+            return None
 
-        # War bot
-        self.warbot_interval = int(os.getenv("WARBOT_INTERVAL", 5))
-        self.warbot_autosubmit = os.getenv("WARBOT_AUTOSUBMIT", "true").lower() in ("true", "1", "yes")
+        courses = {}
+        if COURSES_FILE.exists():
+            try:
+                courses = json.loads(COURSES_FILE.read_text())
+            except ValueError as e:
+                logger.error(f"Invalid {COURSES_FILE}: {e}")
+                return None
 
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super(Config, cls).__new__(cls)
-            cls._instance.load()
-        return cls._instance
+        try:
+            return ConfigSnapshot(
+                user_id=env.get("USER_ID"),
+                auth_discord_webhook_url=env.get("AUTH_DISCORD_WEBHOOK_URL"),
+                headless=self._bool(env.get("HEADLESS", "true")),
+                browser=env.get("BROWSER", "chromium").lower(),
+                session_file=env.get("SESSION_FILE", "data/storage_state.json"),
+                siak_hostname=env.get("SIAK_HOSTNAME") or None,
+                block_resources=self._bool(env.get("BLOCK_RESOURCES", "true")),
+                blocked_resource_types=tuple(
+                    self._split(env.get("BLOCKED_RESOURCE_TYPES", "image,stylesheet,font,media"))
+                ),
+                allowed_hosts=tuple(self._split(env.get("ALLOWED_HOSTS", ""))),
+                metrics_port=int(env["METRICS_PORT"]) if env.get("METRICS_PORT") else None,
+                metrics_file=env.get("METRICS_FILE", "data/metrics.json"),
+                captcha_solvers=tuple(
+                    s.lower() for s in self._split(env.get("CAPTCHA_SOLVER", "stdin"))
+                ),
+                captcha_timeout=float(env.get("CAPTCHA_TIMEOUT", 300)),
+                captcha_port=int(env.get("CAPTCHA_PORT", 8765)),
+                browser_max_rss_mb=int(env.get("BROWSER_MAX_RSS_MB", 1024)),
+                browser_max_age=float(env.get("BROWSER_MAX_AGE", 21600)),
+                browser_max_navigations=int(env.get("BROWSER_MAX_NAVIGATIONS", 500)),
+                hot_windows=hot_windows,
+                hot_interval=float(env.get("HOT_INTERVAL", 5)),
+                backoff_max=float(env.get("BACKOFF_MAX", 600)),
+                username=username,
+                password=password,
+                tracker_interval=int(env.get("TRACKER_INTERVAL", 1200)),
+                tracked_urls=tuple(tracked_urls),
+                tracker_discord_webhook_urls=tuple(tracker_webhooks),
+                tracker_fetch_mode=env.get("TRACKER_FETCH_MODE", "http").lower(),
+                tracker_concurrency=int(env.get("TRACKER_CONCURRENCY", 4)),
+                warbot_interval=int(env.get("WARBOT_INTERVAL", 5)),
+                warbot_autosubmit=self._bool(env.get("WARBOT_AUTOSUBMIT", "true")),
+                warbot_mode=env.get("WARBOT_MODE", "browser").lower(),
+                warbot_opens_at=warbot_opens_at,
+                warbot_probe_interval=float(env.get("WARBOT_PROBE_INTERVAL", 1)),
+                warbot_probe_lead=float(env.get("WARBOT_PROBE_LEAD", 10)),
+                warbot_probe_window=float(env.get("WARBOT_PROBE_WINDOW", 900)),
+                courses=MappingProxyType(courses),
+            )
+        except ValueError as e:
+            # e.g. TRACKER_INTERVAL=20m. A typo made while running must not stop the modules.
+            logger.error(f"Invalid number in the configuration: {e}")
+            return None
 
-    @staticmethod
-    def _is_webhook_valid(url: str) -> bool:
+    def _stat(self) -> tuple[float | None, ...]:
+        return tuple(
+            path.stat().st_mtime if path.exists() else None
+            for path in (self._env_file, COURSES_FILE)
+        )
+
+    async def _validate(self, snapshot: ConfigSnapshot) -> bool:
+        async with httpx.AsyncClient(timeout=5) as client:
+            for url in set(snapshot.tracker_discord_webhook_urls):
+                if not await self._is_webhook_valid(client, url):
+                    logger.error("Invalid TRACKER_DISCORD_WEBHOOK_URL.")
+                    return False
+        return True
+
+    async def _is_webhook_valid(self, client: httpx.AsyncClient, url: str) -> bool:
+        if time.monotonic() - self._webhooks.get(url, float("-inf")) < WEBHOOK_TTL:
+            return True
         try:
-            resp = requests.head(url, timeout=5)
-            return resp.status_code == 200
-        except requests.RequestException:
+            resp = await client.head(url)
+        except httpx.HTTPError:
             return False
+        if resp.status_code != 200:
+            return False
+        self._webhooks[url] = time.monotonic()
+        return True
+
+    @staticmethod
+    def _split(value: str) -> list[str]:
+        """Split a comma-separated variable into its non-empty items."""
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+    @staticmethod
+    def _window(value: str) -> tuple[datetime, datetime]:
+        """Parse a "start/end" pair of ISO 8601 local times."""
+        start, sep, end = value.partition("/")
+        if not sep:
+            raise ValueError(f"{value!r} is not in the form start/end")
+        return datetime.fromisoformat(start.strip()), datetime.fromisoformat(end.strip())
+
+    @staticmethod
+    def _bool(value: str) -> bool:
+        return value.lower() in ("true", "1", "yes")
@@ -0,0 +1,142 @@
+import asyncio
+from bisect import bisect_left
+from contextlib import contextmanager
+import json
+from pathlib import Path
+import time
+from typing import Iterator
+from typing import Self
+
+from loguru import logger
+
+# Upper bounds (seconds) of the latency histogram buckets, from a parse to a CAPTCHA wait
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, float("inf"))
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as exposed by Prometheus."""
+
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def cumulative(self) -> list[int]:
+        total = 0
+        counts = []
+        for count in self.counts:
+            total += count
+            counts.append(total)
+        return counts
+
+
+class Metrics:
+    """Process-wide phase timings and event counters.
+
+    Time a phase with `with Metrics().span("authenticate"): ...` and count events with
+    `Metrics().inc("captcha")`. Everything is kept in memory and can be served in the
+    Prometheus text format (`serve`) or written as JSON (`dump`).
+    """
+
+    _instance: Self | None = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super(Metrics, cls).__new__(cls)
+            cls._instance.started_at = time.time()
+            cls._instance.counters = {}
+            cls._instance.histograms = {}
+        return cls._instance
+
+    def inc(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, phase: str, seconds: float):
+        histogram = self.histograms.get(phase)
+        if histogram is None:
+            histogram = self.histograms[phase] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, phase: str) -> Iterator[None]:
+        """Time the enclosed block, including when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def to_json(self) -> dict:
+        return {
+            "started_at": self.started_at,
+            "counters": dict(self.counters),
+            "phases": {
+                phase: {
+                    "count": h.count,
+                    "sum": h.sum,
+                    "mean": h.sum / h.count if h.count else 0.0,
+                    "max": h.max,
+                    "buckets": dict(zip(map(_le, BUCKETS), h.cumulative())),
+                }
+                for phase, h in self.histograms.items()
+            },
+        }
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE warlock_{name}_total counter")
+            lines.append(f"warlock_{name}_total {value}")
+
+        lines.append("# TYPE warlock_phase_seconds histogram")
+        for phase, h in sorted(self.histograms.items()):
+            for bound, count in zip(BUCKETS, h.cumulative()):
+                labels = f'phase="{phase}",le="{_le(bound)}"'
+                lines.append(f"warlock_phase_seconds_bucket{{{labels}}} {count}")
+            lines.append(f'warlock_phase_seconds_sum{{phase="{phase}"}} {h.sum}')
+            lines.append(f'warlock_phase_seconds_count{{phase="{phase}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, port: int, host: str = "127.0.0.1") -> asyncio.Server:
+        """Serve `render` over HTTP on every path, e.g. http://127.0.0.1:<port>/metrics."""
+        server = await asyncio.start_server(self._handle, host, port)
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return server
+
+    def dump(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_json(), indent=2))
+        logger.info(f"Metrics written to {path}.")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # Only the request head matters, every request gets the metrics
+            while (await reader.readline()).strip():
+                pass
+            body = self.render().encode("utf-8")
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                + f"Content-Length: {len(body)}\r\n".encode("ascii")
+                + b"Connection: close\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _le(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
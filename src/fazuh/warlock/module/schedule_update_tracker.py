@@ -1,162 +1,307 @@
 import asyncio
-from datetime import datetime
 import difflib
-import io
+import hashlib
 from pathlib import Path
+from typing import Literal
 
-from bs4 import BeautifulSoup
+import httpx
 from loguru import logger
-import requests
 
 from fazuh.warlock.config import Config
+from fazuh.warlock.config import ConfigSnapshot
+from fazuh.warlock.metrics import Metrics
+from fazuh.warlock.notifier import Notification
+from fazuh.warlock.notifier import Notifier
+from fazuh.warlock.scheduler import PollScheduler
+from fazuh.warlock.scheduler import TIMEOUT_ERRORS
+from fazuh.warlock.siak.page_state import classify
+from fazuh.warlock.siak.page_state import PageState
+from fazuh.warlock.siak.schedule import Course
+from fazuh.warlock.siak.schedule import diff_courses
+from fazuh.warlock.siak.schedule import index_courses
+from fazuh.warlock.siak.schedule_parser import fingerprint
+from fazuh.warlock.siak.schedule_parser import parse_courses
+from fazuh.warlock.siak.session import SiakSession
 from fazuh.warlock.siak.siak import Siak
+from fazuh.warlock.store import ScheduleStore
+
+
+class TrackedView:
+    """One tracked Schedule URL with its own history store and webhook."""
+
+    def __init__(self, url: str, webhook_url: str, store: ScheduleStore):
+        self.url = url
+        self.webhook_url = webhook_url
+        self.store = store
+        # HTTP cache validators (ETag/Last-Modified) of the page being processed
+        self.validators: dict[str, str | None] = {}
 
 
 class ScheculeUpdateTracker:
-    def __init__(self):
-        self.conf = Config()
+    def __init__(self, session: SiakSession | None = None):
+        """`session` is shared with other modules. A new one is used if None."""
+        self.config = Config()
+        # Snapshot for the current iteration, so a reload never changes settings midway
+        self.conf: ConfigSnapshot = self.config.snapshot
+        self.notifier = Notifier()
+        self.metrics = Metrics()
+        self.scheduler = PollScheduler("tracker")
 
-        data_folder = Path("data")
-        if not data_folder.exists():
-            data_folder.mkdir(parents=True)
+        self.data_folder = Path("data")
+        if not self.data_folder.exists():
+            self.data_folder.mkdir(parents=True)
 
-        self.cache_file = data_folder.joinpath("latest_courses.txt")
-        if not self.cache_file.exists():
-            self.cache_file.touch()
+        self.views: dict[str, TrackedView] = {}
+        self._sync_views()
 
-        self.prev_content = self.cache_file.read_text() if self.cache_file.exists() else ""
+        self.session = session
+        # A shared browser may be in use by another module, so it is never closed here
+        self._owns_browser = session is None
 
     async def start(self):
-        self.siak = Siak(self.conf.username, self.conf.password)
-        await self.siak.start()
-        await self.siak.authenticate()
+        # Fetch mode is fixed for the lifetime of the tracker since it decides the session setup.
+        self.fetch_mode = self.conf.tracker_fetch_mode
+        if self.session is None:
+            self.session = SiakSession(Siak(self.conf.username, self.conf.password))
+        self.siak = self.session.siak
+        if self.fetch_mode == "http":
+            await self._export_session()
+        else:
+            await self.siak.ensure_browser()
+            await self.session.authenticate()
         while True:
-            self.conf.load()  # Reload config to allow dynamic changes to .env
+            self.conf = await self.config.refresh()  # Pick up changes to .env
+            changed = None
             try:
-                # Try to use existing session
-                if not await self.siak.is_logged_in():
-                    # Otherwise re-authenticate
-                    await self.siak.close()
-                    self.siak = Siak(self.conf.username, self.conf.password)
-                    await self.siak.start()
-                    if not await self.siak.authenticate():
+                if self.fetch_mode == "browser":
+                    await self.siak.ensure_browser()  # Relaunched if it died
+                # Recycle a browser that grew too large between cycles, logging its stats
+                await self.session.check_health()
+                # Try to use existing session. In HTTP mode, expiry is detected on fetch instead.
+                generation = self.session.generation
+                if self.fetch_mode == "browser" and not await self.siak.is_session_valid():
+                    # Otherwise re-authenticate, unless the war bot just did
+                    if not await self.session.authenticate(generation):
                         continue
 
-                await self.run()
+                with self.metrics.span("tracker_cycle"):
+                    changed = await self.run()
             except Exception as e:
+                if isinstance(e, TIMEOUT_ERRORS):
+                    self.metrics.inc("timeouts")
                 logger.error(f"An error occurred: {e}")
-                await self.siak.close()
+                if self.fetch_mode == "browser":
+                    await self._recover_browser()
             else:
                 logger.info("Schedule update tracker completed successfully.")
             finally:
-                logger.info(
-                    f"Waiting for the next check in {self.conf.tracker_interval} seconds..."
-                )
-                await asyncio.sleep(self.conf.tracker_interval)
+                self.scheduler.record(changed)
+                await self.scheduler.wait(self.conf.tracker_interval)
+
+    async def run(self) -> bool | None:
+        """Check every tracked URL, at most TRACKER_CONCURRENCY at a time.
+
+        Returns whether any page changed, or None if no page could be checked.
+        """
+        self._sync_views()
+        semaphore = asyncio.Semaphore(max(1, self.conf.tracker_concurrency))
+
+        async def check(view: TrackedView) -> bool | None:
+            async with semaphore:
+                # Let the war bot have the server to itself while it is filling the IRS
+                await self.session.wait_for_priority()
+                try:
+                    return await self.check(view)
+                except Exception as e:
+                    if isinstance(e, TIMEOUT_ERRORS):
+                        self.metrics.inc("timeouts")
+                    logger.error(f"{view.url}: An error occurred: {e}")
+                    return None
 
-    async def run(self):
+        results = await asyncio.gather(*(check(view) for view in self.views.values()))
+        if any(results):
+            return True
+        return False if False in results else None
+
+    async def check(self, view: TrackedView) -> bool | None:
+        """Check one tracked URL. Returns whether it changed, or None if it was not reached."""
         # 1. GET tracked page
-        await self.siak.page.goto(self.conf.tracked_url)
-        if self.siak.page.url != self.conf.tracked_url:
-            logger.error(f"Expected {self.conf.tracked_url}. Found {self.siak.page.url} instead.")
-            return
-
-        # 2. Parse response
-        content = await self.siak.page.content()
-        soup = BeautifulSoup(content, "html.parser")
-
-        courses: list[str] = []
-
-        # every course starts with <th class="sub ...">
-        for hdr in soup.find_all("th", class_=("sub", "border2", "pad2")):
-            if hdr.parent is None:
-                continue
-            # 2a. course header
-            course_line = hdr.get_text(strip=True)
-            course_line = course_line.replace("<strong>", "").replace("</strong>", "")
-
-            # 2b. collect all following <tr> rows that belong to this course
-            classes_info = []
-            for sibling in hdr.parent.find_next_siblings("tr"):
-                # stop if we hit the next course header
-                if sibling.find("th", class_=("sub", "border2", "pad2")):
-                    break
-
-                # collect the text of every <td> in this <tr>
-                cells = [td.get_text(strip=True) for td in sibling.find_all("td")]
-                if not cells:
-                    continue
-
-                # build one line per class, e.g.
-                # "Kelas Teori Matriks (A); Indonesia; 25/08/2025 - 19/12/2025; Rabu, 08.00-09.40; D.109; - Dra. ..."
-                class_line = "; ".join(cells[1:])  # skip the first cell (index number)
-                classes_info.append(class_line)
-
-            # 2c. merge course header + its classes
-            full_entry = (
-                f"{course_line}: | " + " | ".join(classes_info) if classes_info else course_line
+        with self.metrics.span("fetch"):
+            content = await self._fetch_tracked_page(view)
+        if content is None or content is False:
+            return content  # Not reached, or not modified since the last check
+
+        # 2. Skip parsing if the page is the same as in the last check
+        page_hash = fingerprint(content)
+        if page_hash == view.store.get_meta("page_hash"):
+            logger.info(f"{view.url}: No updates detected (page unchanged).")
+            view.store.touch()
+            view.store.set_meta(**view.validators)
+            return False
+
+        # 3. Parse response into courses keyed by course code and curriculum
+        with self.metrics.span("parse"):
+            curr = index_courses(parse_courses(content))
+
+        # 4. Compare with previous courses
+        with self.metrics.span("store_load"):
+            prev = view.store.latest()
+        if prev == curr:
+            logger.info(f"{view.url}: No updates detected.")
+            view.store.touch()
+            view.store.set_meta(page_hash=page_hash, **view.validators)
+            return False
+        logger.info(f"{view.url}: Update detected!")
+
+        with self.metrics.span("diff"):
+            changes = diff_courses(prev, curr)
+        if changes:
+            # 5. Create diff and send to webhook
+            diff = "\n".join(changes)
+            logger.debug(diff)
+            message = "**Jadwal SIAK UI Berubah!**"
+            if len(self.views) > 1:
+                message = f"{message}\n<{view.url}>"
+            self.notifier.notify(
+                Notification(
+                    webhook_url=view.webhook_url,
+                    username="Warlock Tracker",
+                    content=message,
+                    diff=diff,
+                    avatar_url="https://academic.ui.ac.id/favicon.ico",
+                )
             )
-            courses.append(full_entry)
-
-        curr = "\n".join(courses)
-
-        # 3. Compare with previous content
-        if self.prev_content == curr:
-            logger.info("No updates detected.")
-            return
-        logger.info("Update detected!")
-
-        # compare using set
-        old_courses = set(self.prev_content.splitlines()) if self.prev_content else set()
-        new_courses = set(courses)
-        added_courses = new_courses - old_courses
-        removed_courses = old_courses - new_courses
-
-        changes = []
-        changes.extend([f"+ {e}" for e in added_courses])
-        changes.extend([f"- {e}" for e in removed_courses])
-        changes.sort()
-        if not changes:
-            logger.info("No meaningful changes detected (only order changed).")
-            return
-
-        # 4. Create diff and send to webhook
-        diff = "\n".join(changes)
-        logger.debug(diff)
-        await self._send_diff_to_webhook(self.conf.tracker_discord_webhook_url, diff)
-
-        self.prev_content = curr
-        self.cache_file.write_text(curr)
-
-    async def _send_diff_to_webhook(self, webhook_url: str, diff: str):
-        message = "**Jadwal SIAK UI Berubah!**"
-        data = {
-            "username": "Warlock Tracker",
-            "avatar_url": "https://academic.ui.ac.id/favicon.ico",
+        else:
+            logger.info(f"{view.url}: No meaningful changes detected.")
+
+        with self.metrics.span("store_record"):
+            view.store.record(curr)
+        view.store.set_meta(page_hash=page_hash, **view.validators)
+        return True
+
+    def _sync_views(self):
+        """Create and drop tracked views to match TRACKED_URL."""
+        urls = dict(zip(self.conf.tracked_urls, self.conf.tracker_discord_webhook_urls))
+        for url in self.views.keys() - urls.keys():
+            self.views.pop(url).store.close()
+        for i, (url, webhook_url) in enumerate(urls.items()):
+            if url in self.views:
+                self.views[url].webhook_url = webhook_url
+            else:
+                self.views[url] = TrackedView(url, webhook_url, self._open_store(url, i == 0))
+
+    def _open_store(self, url: str, is_first: bool) -> ScheduleStore:
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        path = self.data_folder.joinpath(f"schedule_{name}.db")
+
+        # Older versions tracked a single URL in data/schedule.db
+        legacy_db = self.data_folder.joinpath("schedule.db")
+        if is_first and legacy_db.exists() and not path.exists():
+            for suffix in ("", "-wal", "-shm"):
+                legacy = legacy_db.with_name(legacy_db.name + suffix)
+                if legacy.exists():
+                    legacy.rename(path.with_name(path.name + suffix))
+
+        store = ScheduleStore(path)
+        store.set_meta(url=url)
+
+        # Seed the history from the flat snapshot used by even older versions
+        legacy_file = self.data_folder.joinpath("latest_courses.txt")
+        if is_first and store.is_empty() and legacy_file.exists():
+            lines = legacy_file.read_text().splitlines()
+            store.record(index_courses([Course.from_line(line) for line in lines]))
+            logger.info(f"Imported {len(lines)} courses from {legacy_file}.")
+        return store
+
+    async def _fetch_tracked_page(self, view: TrackedView) -> str | Literal[False] | None:
+        """Fetch the tracked page HTML.
+
+        Returns False if it was not modified since the last check (HTTP 304), or None if it
+        could not be reached.
+        """
+        url = view.url
+        if self.fetch_mode == "browser":
+            # Each view gets its own tab in the shared, authenticated context
+            async with self.siak.tab() as page:
+                with self.metrics.span("navigate"):
+                    await page.goto(url)
+                if page.url != url:
+                    logger.error(f"Expected {url}. Found {page.url} instead.")
+                    return None
+                with self.metrics.span("page_content"):
+                    content = await page.content()
+            # Overload pages are served at the requested URL, and would parse as no courses
+            state = classify(content, url)
+            if state is not PageState.OK:
+                logger.error(f"Expected {url}. Found {state.value} page instead.")
+                return None
+            return content
+
+        generation = self.session.generation
+        resp = await self.siak.fetch(url, headers=self._conditional_headers(view))
+        state = self._classify(view, resp)
+        if state in (PageState.LOGIN, PageState.CAPTCHA):
+            # Session expired (redirected to login or CAPTCHA). Log in again.
+            if not await self._reauthenticate(generation):
+                return None
+            resp = await self.siak.fetch(url, headers=self._conditional_headers(view))
+            state = self._classify(view, resp)
+        if state is not PageState.OK:
+            logger.error(f"Expected {url}. Found {resp.url} ({state.value}) instead.")
+            return None
+
+        if resp.status_code == 304:
+            logger.info(f"{url}: No updates detected (not modified).")
+            view.store.touch()
+            return False
+
+        # Only saved once the page has been processed, so a failed check is fetched again
+        view.validators = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
         }
-        files = None
-        diff_file = None
+        return resp.text
 
-        # Discord has a 2000 character limit for messages (see https://discord.com/developers/docs/resources/webhook#execute-webhook-jsonform-params)
-        # Send text if diff is under 1900 characters, otherwise send as file
-        if len(diff) < 1900:
-            data["content"] = f"{message}\n```diff\n{diff}\n```"
-        else:
-            data["content"] = message
-            diff_file = io.BytesIO(diff.encode("utf-8"))
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"siak_schedule_diff_{timestamp}.txt"
-            files = {"file": (filename, diff_file, "text/plain")}
+    def _conditional_headers(self, view: TrackedView) -> dict[str, str]:
+        headers = {}
+        if etag := view.store.get_meta("etag"):
+            headers["If-None-Match"] = etag
+        if last_modified := view.store.get_meta("last_modified"):
+            headers["If-Modified-Since"] = last_modified
+        return headers
 
+    def _classify(self, view: TrackedView, resp: httpx.Response) -> PageState:
+        state = classify(resp.text, str(resp.url), resp.status_code)
+        if state is not PageState.OK:
+            return state
+        if str(resp.url) != view.url:
+            return PageState.LOGIN  # Redirected away, e.g. to Welcome or ChangeRole
+        return state
+
+    async def _reauthenticate(self, generation: int) -> bool:
+        """Log in again, unless another view (or module) already did since `generation`."""
+        logger.info("HTTP session expired. Re-authenticating...")
+        return await self._export_session(generation)
+
+    async def _export_session(self, generation: int | None = None) -> bool:
+        """Log in for the HTTP client. A browser launched to solve a CAPTCHA is freed after."""
         try:
-            resp = await asyncio.to_thread(requests.post, webhook_url, data=data, files=files)
-            resp.raise_for_status()
-            logger.info("Content sent to webhook successfully.")
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error sending content to webhook: {e}")
+            if not await self.session.authenticate(generation):
+                return False
+            await self.siak.export_cookies()
+            return True
         finally:
-            if diff_file:
-                diff_file.close()
+            if self._owns_browser:
+                await self.siak.close_browser()
+
+    async def _recover_browser(self):
+        """Run the next cycle on a fresh browser with the same session, in case this is stuck."""
+        try:
+            await self.session.check_health(force=True)
+        except Exception as e:
+            logger.error(f"Could not recycle the browser: {e}")
+            if self._owns_browser:
+                await self.siak.close_browser()  # Relaunched by ensure_browser next cycle
 
     def _get_diff(self, old: str, new: str) -> str:
         diff = difflib.unified_diff(
@@ -1,98 +1,310 @@
 import asyncio
 import time
-import json
 import os
+from urllib.parse import urlencode
 
+import httpx
 from loguru import logger
 
 from fazuh.warlock.config import Config
+from fazuh.warlock.config import ConfigSnapshot
+from fazuh.warlock.metrics import Metrics
+from fazuh.warlock.scheduler import PollScheduler
+from fazuh.warlock.scheduler import TIMEOUT_ERRORS
+from fazuh.warlock.siak.course_plan import CourseRow
+from fazuh.warlock.siak.course_plan import match_courses
+from fazuh.warlock.siak.course_plan import parse_course_plan
+from fazuh.warlock.siak.page_state import classify
+from fazuh.warlock.siak.page_state import PageState
 from fazuh.warlock.siak.path import Path
+from fazuh.warlock.siak.session import SiakSession
 from fazuh.warlock.siak.siak import Siak
 
+# Pre-arm: seconds between keep-alive requests while waiting for registration to open
+KEEPALIVE_INTERVAL = 60
+# Requests used to sync the server clock, spaced so their Date headers straddle second ticks
+CLOCK_SAMPLES = 5
+CLOCK_SAMPLE_SPACING = 0.35
+# Seconds after a renewal before a session that still sees registration closed is renewed again
+STALE_AFTER = 5
+
+# Returns every <tr> that has a course label and a lecturer cell, as CourseRow fields
+EXTRACT_ROWS_JS = """
+() => Array.from(document.querySelectorAll("tr")).flatMap((row, index) => {
+    const label = row.querySelector("label");
+    const prof = row.querySelector("td:nth-child(9)");
+    if (!label || !prof) return [];
+    const radio = row.querySelector('input[type="radio"]');
+    return [{
+        index,
+        course: label.innerText,
+        prof: prof.innerText,
+        radio_name: radio ? radio.name : null,
+        radio_value: radio ? radio.value : null,
+    }];
+})
+"""
+
+# Checks the radio button of each given <tr> index, firing the same events as a click
+CHECK_ROWS_JS = """
+(indices) => {
+    const rows = document.querySelectorAll("tr");
+    for (const index of indices) {
+        const radio = rows[index].querySelector('input[type="radio"]');
+        if (!radio.checked) radio.click();
+    }
+}
+"""
+
 
 class WarBot:
-    def __init__(self):
-        self.conf = Config()
+    def __init__(self, session: SiakSession | None = None):
+        """`session` is shared with other modules. A new one is used if None."""
+        self.config = Config()
+        # Snapshot for the current iteration, so a reload never changes settings midway
+        self.conf: ConfigSnapshot = self.config.snapshot
+        self.metrics = Metrics()
+        self.session = session
+        # Retries are not about catching changes, so only overload and hot windows adapt them
+        self.scheduler = PollScheduler("war bot", adaptive=False)
 
         if not os.path.exists("courses.json"):
             logger.error("courses.json file not found. Please create it with the required courses.")
             raise FileNotFoundError("courses.json file not found.")
 
-        with open("courses.json", "r") as f:
-            self.courses = json.load(f)
-
     async def start(self):
-        # Don't reuse sessions. self.is_not_registration_period() will always return True until we re-authenticate.
+        # Keep one warm browser across retries. It is only relaunched if it died.
+        if self.session is None:
+            self.session = SiakSession(Siak(self.conf.username, self.conf.password))
+        self.siak = self.session.siak
         while True:
-            self.siak = Siak(self.conf.username, self.conf.password)
-            await self.siak.start()
-            self.conf.load()
+            self.conf = await self.config.refresh()  # Pick up changes to .env and courses.json
             try:
-                if not await self.siak.authenticate():
+                if not (self.conf.warbot_mode == "http" and self.conf.warbot_autosubmit):
+                    # HTTP mode only needs a browser to solve a CAPTCHA or read an unknown form
+                    await self.siak.ensure_browser()
+                # Retrying for hours grows the browser. Relaunch it between attempts if too large.
+                await self.session.check_health()
+
+                if not await self.session.authenticate():
                     logger.error("Authentication failed. Is the server down?")
                     continue
 
-                await self.run()
+                opens_at = self.conf.warbot_opens_at
+                if opens_at is not None and self.siak.clock.now() < opens_at.timestamp():
+                    done = await self.prearm()
+                else:
+                    # Other modules sharing the session hold off until the attempt is over
+                    async with self.session.priority():
+                        if self.conf.warbot_mode == "http" and self.conf.warbot_autosubmit:
+                            await self.siak.export_cookies()
+                            done = await self.run_http()
+                        else:
+                            done = await self.run()
+                if done:
+                    logger.info("Script finished. Press Ctrl+C to exit (including the browser).")
+                    # Keep the browser open for review without blocking the event loop
+                    await asyncio.Event().wait()
             except Exception as e:
+                if isinstance(e, TIMEOUT_ERRORS):
+                    self.metrics.inc("timeouts")
                 logger.error(f"An error occurred: {e}")
             finally:
-                await self.siak.close()
-                logger.info(f"Retrying in {self.conf.warbot_interval} seconds...")
-                await asyncio.sleep(self.conf.warbot_interval)
+                self.scheduler.record()
+                await self.scheduler.wait(self.conf.warbot_interval)
 
-    async def run(self):
-        await self.siak.page.goto(Path.COURSE_PLAN_EDIT, wait_until="domcontentloaded")
+    async def run(self) -> bool:
+        """Fill (and submit) the IRS form in the browser. Returns whether it was completed."""
+        await self.siak.ensure_browser()
+        with self.metrics.span("navigate"):
+            await self.siak.page.goto(Path.COURSE_PLAN_EDIT, wait_until="domcontentloaded")
+        loaded_at = time.perf_counter()
         if self.siak.page.url != Path.COURSE_PLAN_EDIT:
             logger.error(f"Expected {Path.COURSE_PLAN_EDIT}. Found {self.siak.page.url} instead.")
-            return
+            return False
         if await self.is_not_registration_period():
             logger.error(
                 "You cannot fill out the IRS because the academic registration period has not started."
             )
-            return
+            # The server keeps reporting this for the rest of the session, even after registration
+            # opens. Drop the session so the next attempt logs in fresh in the same browser.
+            await self.siak.reset_session()
+            return False
 
         logger.success("Successfully navigated to the Course Plan Edit page.")
-        rows = await self.siak.page.query_selector_all("tr")
-        for row in rows:
-            course_element = await row.query_selector("label")
-            prof_element = await row.query_selector("td:nth-child(9)")
-            if not course_element or not prof_element:
-                continue
+        # Read the whole table in one round trip, match in Python, then check all radios at once
+        with self.metrics.span("select"):
+            rows = [CourseRow(**row) for row in await self.siak.page.evaluate(EXTRACT_ROWS_JS)]
+            selected, missing = match_courses(rows, self.conf.courses)
+            await self.siak.page.evaluate(CHECK_ROWS_JS, [row.index for row in selected])
+        for row in selected:
+            logger.info(f"Selected course: {row.course} with prof: {row.prof}")
 
-            course = await course_element.inner_text()
-            prof = await prof_element.inner_text()
+        logger.info("Finished selecting courses")
+        for key, val in missing.items():
+            logger.error(f"Course not found: {key} with prof: {val}")
 
-            for key, val in self.courses.items():
-                if key.lower() not in course.lower() or val.lower() not in prof.lower():
-                    continue
+        if self.conf.warbot_autosubmit:
+            with self.metrics.span("submit"):
+                await self.siak.page.click("input[type=submit][value='Simpan IRS']")
+            elapsed = time.perf_counter() - loaded_at
+            self.metrics.observe("time_to_submit", elapsed)
+            logger.success(f"IRS saved. Page load to submit took {elapsed * 1000:.0f} ms.")
+        else:
+            elapsed = time.perf_counter() - loaded_at
+            logger.info(f"Page load to selection took {elapsed * 1000:.0f} ms.")
+            await self.siak.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
 
-                button = await row.query_selector('input[type="radio"]')
-                if not button:
-                    continue
+        logger.success("WarBot completed successfully.")
+        return True
+
+    async def run_http(self) -> bool:
+        """Fetch the IRS form over HTTP and submit it directly, without rendering the page.
+
+        Falls back to the browser (`run`) if the form is not recognized. Returns whether the
+        IRS was saved.
+        """
+        with self.metrics.span("navigate"):
+            resp = await self.siak.fetch(Path.COURSE_PLAN_EDIT)
+        loaded_at = time.perf_counter()
+        if str(resp.url) != Path.COURSE_PLAN_EDIT:
+            logger.error(f"Expected {Path.COURSE_PLAN_EDIT}. Found {resp.url} instead.")
+            return False
+        if classify(resp.text, str(resp.url), resp.status_code) is PageState.REGISTRATION_CLOSED:
+            logger.error(
+                "You cannot fill out the IRS because the academic registration period has not started."
+            )
+            await self.siak.reset_session()
+            return False
+        return await self.submit_http(resp, loaded_at)
 
-                await button.check()
-                logger.info(f"Selected course: {course} with prof: {prof}")
-                del self.courses[key]
-                break
+    async def submit_http(self, resp: httpx.Response, loaded_at: float) -> bool:
+        """Select courses in the fetched CoursePlanEdit `resp` and submit it over HTTP.
+
+        `loaded_at` is when the page arrived, for timing. Returns whether the IRS was saved.
+        """
+        with self.metrics.span("parse"):
+            form = parse_course_plan(resp.text, str(resp.url))
+        if form is None:
+            logger.warning("Unrecognized Course Plan Edit form. Falling back to the browser.")
+            return await self.run()
+
+        logger.success("Fetched the Course Plan Edit form.")
+        with self.metrics.span("select"):
+            selected, missing = match_courses(form.rows, self.conf.courses)
+        for row in selected:
+            logger.info(f"Selected course: {row.course} with prof: {row.prof}")
 
         logger.info("Finished selecting courses")
-        for key, val in self.courses.items():
+        for key, val in missing.items():
             logger.error(f"Course not found: {key} with prof: {val}")
 
-        if self.conf.warbot_autosubmit:
-            await self.siak.page.click("input[type=submit][value='Simpan IRS']")
-            logger.success("IRS saved.")
-        else:
-            await self.siak.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        with self.metrics.span("submit"):
+            resp = await self.siak.client.post(
+                form.action,
+                content=urlencode(form.payload(selected)),
+                headers={
+                    "Content-Type": "application/x-www-form-urlencoded",
+                    "Origin": Path.HOSTNAME.rstrip("/"),
+                    "Referer": Path.COURSE_PLAN_EDIT,
+                },
+            )
+        elapsed = time.perf_counter() - loaded_at
+        self.metrics.observe("time_to_submit", elapsed)
+        if resp.status_code >= 400:
+            logger.error(f"Saving IRS failed with HTTP {resp.status_code}.")
+            return False
+        # Redirects are followed, so an expired session or an overloaded server still ends in
+        # a 200. The page it ends on tells them apart from a saved IRS.
+        state = classify(resp.text, str(resp.url), resp.status_code)
+        if state is not PageState.OK:
+            logger.error(f"Saving IRS failed. Found {resp.url} ({state.value}) instead.")
+            return False
+        logger.success(f"IRS saved. Page load to submit took {elapsed * 1000:.0f} ms.")
 
         logger.success("WarBot completed successfully.")
-        logger.info("Script finished. Press Ctrl+C to exit (including the browser).")
-        time.sleep(float('inf'))
+        return True
+
+    async def prearm(self) -> bool:
+        """Wait for registration to open (WARBOT_OPENS_AT) with a warm session, then fire.
+
+        Until shortly before opening, only Welcome is requested every minute, to keep the
+        session alive and sync the server clock. From WARBOT_PROBE_LEAD seconds before opening,
+        CoursePlanEdit is requested over HTTP every WARBOT_PROBE_INTERVAL seconds (backing off
+        while the server is overloaded), and the IRS is filled as soon as a response has the
+        form. Probing stops WARBOT_PROBE_WINDOW seconds after opening. Returns whether the IRS
+        was saved.
+        """
+        opens_at = self.conf.warbot_opens_at.timestamp()
+        clock = self.siak.clock
+        await self.siak.export_cookies()
+        for _ in range(CLOCK_SAMPLES):
+            await self._keep_alive()
+            await asyncio.sleep(CLOCK_SAMPLE_SPACING)
+        logger.info(
+            f"Server clock is {clock.offset:+.3f} s (±{clock.uncertainty:.3f}) from local time."
+        )
+
+        while (remaining := opens_at - clock.now()) > self.conf.warbot_probe_lead:
+            logger.info(f"Registration opens in {remaining:.0f} seconds. Keeping session warm.")
+            lead = remaining - self.conf.warbot_probe_lead
+            await asyncio.sleep(min(lead, KEEPALIVE_INTERVAL))
+            await self._keep_alive()
+
+        # Other modules sharing the session hold off until the IRS is filled
+        async with self.session.priority():
+            return await self._probe(opens_at)
+
+    async def _probe(self, opens_at: float) -> bool:
+        """Request CoursePlanEdit until it has the form, then fill it. See `prearm`."""
+        clock = self.siak.clock
+        # Probes before opening get the session stuck on "closed", so renew it on the first
+        # closed page after opening, then again if the page has not flipped a while later
+        renew_after = opens_at
+        # If opening slips, stop holding off other modules and retry like without pre-arming
+        give_up_at = opens_at + self.conf.warbot_probe_window
+        while clock.now() < give_up_at:
+            with self.metrics.span("probe"):
+                resp = await self.siak.fetch(Path.COURSE_PLAN_EDIT)
+            loaded_at = time.perf_counter()
+            state = classify(resp.text, str(resp.url), resp.status_code)
+            self.scheduler.record()  # Counts overloaded pages, to back off below
+            if state is PageState.OK and str(resp.url) == Path.COURSE_PLAN_EDIT:
+                logger.success("Registration is open!")
+                if self.conf.warbot_mode == "http" and self.conf.warbot_autosubmit:
+                    return await self.submit_http(resp, loaded_at)
+                return await self.run()
+
+            stale = state is PageState.REGISTRATION_CLOSED and clock.now() >= renew_after
+            if stale or state in (PageState.LOGIN, PageState.CAPTCHA):
+                logger.warning(f"Renewing the session (page is {state.value}).")
+                if stale:
+                    await self.siak.reset_session()
+                if not await self.session.authenticate():
+                    return False
+                await self.siak.export_cookies()
+                renew_after = clock.now() + STALE_AFTER
+                continue
+            delay = self.scheduler.backoff(self.conf.warbot_probe_interval)
+            if self.scheduler.overloads:
+                logger.warning(f"Server overloaded ({state.value}). Next probe in {delay:.1f} s.")
+            await asyncio.sleep(delay)
+
+        logger.error(
+            f"Registration did not open within {self.conf.warbot_probe_window:.0f} seconds."
+            " Stopped probing."
+        )
+        return False
+
+    async def _keep_alive(self):
+        """Request a cheap page to keep the session alive, logging in again if it expired."""
+        resp = await self.siak.fetch(Path.WELCOME)
+        state = classify(resp.text, str(resp.url), resp.status_code)
+        if state in (PageState.LOGIN, PageState.CAPTCHA):
+            logger.warning("Session expired while waiting. Re-authenticating...")
+            if await self.session.authenticate():
+                await self.siak.export_cookies()
 
     async def is_not_registration_period(self) -> bool:
         """Check if the current period is not a registration period."""
-        content = await self.siak.page.content()
-        return (
-            "Anda tidak dapat mengisi IRS karena periode registrasi akademik belum dimulai"
-            in content
-        )
+        return await self.siak.classify() is PageState.REGISTRATION_CLOSED
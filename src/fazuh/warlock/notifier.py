@@ -0,0 +1,238 @@
+import asyncio
+import base64
+from collections import deque
+from dataclasses import asdict
+from dataclasses import dataclass
+from datetime import datetime
+import json
+from pathlib import Path
+import time
+from typing import Self
+
+import httpx
+from loguru import logger
+
+from fazuh.warlock.metrics import Metrics
+
+# Discord has a 2000 character limit for messages (see https://discord.com/developers/docs/resources/webhook#execute-webhook-jsonform-params)
+# Diffs longer than this are sent as a file instead
+MAX_INLINE_DIFF = 1900
+MAX_ATTEMPTS = 5
+# 429s are not failures, but a webhook that keeps answering them is given up on eventually
+MAX_RATE_LIMITED = 10
+
+
+@dataclass(slots=True)
+class Notification:
+    """A webhook message waiting to be sent.
+
+    Pending notifications with the same webhook, username and content are coalesced into one
+    message by joining their diffs.
+    """
+
+    webhook_url: str
+    username: str
+    content: str
+    diff: str | None = None
+    avatar_url: str | None = None
+    # (filename, data, content type)
+    file: tuple[str, bytes, str] | None = None
+
+    def can_merge(self, other: "Notification") -> bool:
+        return (
+            self.diff is not None
+            and other.diff is not None
+            and self.file is None
+            and other.file is None
+            and (self.webhook_url, self.username, self.content, self.avatar_url)
+            == (other.webhook_url, other.username, other.content, other.avatar_url)
+        )
+
+    def to_json(self) -> dict:
+        data = asdict(self)
+        if self.file is not None:
+            name, payload, content_type = self.file
+            data["file"] = [name, base64.b64encode(payload).decode("ascii"), content_type]
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Notification":
+        if data.get("file") is not None:
+            name, payload, content_type = data["file"]
+            data["file"] = (name, base64.b64decode(payload), content_type)
+        return cls(**data)
+
+
+class Notifier:
+    """Sends webhook notifications in the background over one pooled HTTP client.
+
+    `notify` only queues a message and never waits on the network. Each webhook has its own
+    worker delivering its messages in order, waiting out Discord rate limits (429 and
+    `Retry-After`) instead of dropping messages. A rate-limited webhook therefore never holds
+    up another, e.g. a CAPTCHA alert behind tracker diffs. Messages still pending on `close`
+    are saved and sent on the next run.
+    """
+
+    _instance: Self | None = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super(Notifier, cls).__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self, queue_file: Path = Path("data/notifier_queue.json"), maxsize: int = 100):
+        self.queue_file = queue_file
+        self.maxsize = maxsize
+        self.pending: deque[Notification] = deque()
+        self.client: httpx.AsyncClient | None = None
+        # Webhook URL -> its worker, and the notification that worker is sending
+        self._workers: dict[str, asyncio.Task] = {}
+        self._sending: dict[str, Notification] = {}
+        # Webhook URL -> monotonic time before which it must not be called
+        self._blocked_until: dict[str, float] = {}
+        self._load()
+
+    def notify(self, notification: Notification):
+        """Queue a notification. Returns immediately."""
+        for pending in self.pending:
+            if pending.can_merge(notification):
+                pending.diff = f"{pending.diff}\n{notification.diff}"
+                break
+        else:
+            if len(self.pending) >= self.maxsize:
+                dropped = self.pending.popleft()
+                logger.warning(f"Notification queue is full. Dropped: {dropped.content!r}")
+            self.pending.append(notification)
+        self.start()
+
+    def start(self):
+        """Start delivering, including notifications restored from the last run."""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=10, limits=httpx.Limits(max_connections=4, max_keepalive_connections=4)
+            )
+        loop = asyncio.get_running_loop()
+        for url in {notification.webhook_url for notification in self.pending}:
+            worker = self._workers.get(url)
+            if worker is None or worker.done():
+                self._workers[url] = loop.create_task(self._run(url))
+
+    async def close(self):
+        """Stop the workers and save undelivered notifications for the next run."""
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self.pending.extendleft(self._sending.values())
+        self._sending.clear()
+        self._save()
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def _run(self, webhook_url: str):
+        """Deliver the pending notifications of one webhook, then stop until `start`."""
+        while True:
+            notification = next((n for n in self.pending if n.webhook_url == webhook_url), None)
+            if notification is None:
+                return
+            self.pending.remove(notification)
+            self._sending[webhook_url] = notification
+            await self._deliver(notification)
+            del self._sending[webhook_url]
+
+    async def _deliver(self, notification: Notification):
+        attempt = rate_limited = 0
+        while attempt < MAX_ATTEMPTS and rate_limited < MAX_RATE_LIMITED:
+            delay = self._blocked_until.get(notification.webhook_url, 0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                with Metrics().span("webhook_post"):
+                    resp = await self.client.post(
+                        notification.webhook_url, **self._request(notification)
+                    )
+            except httpx.HTTPError as e:
+                attempt += 1
+                logger.warning(f"Error sending notification (attempt {attempt}): {e}")
+                await asyncio.sleep(2**attempt)
+                continue
+
+            self._update_rate_limit(notification.webhook_url, resp)
+            if resp.status_code == 429:
+                Metrics().inc("webhook_rate_limited")
+                rate_limited += 1
+                # Not a failure, so it does not count as an attempt
+                logger.warning(f"Webhook rate limited. Retrying in {self._retry_after(resp)}s.")
+                continue
+            if resp.status_code >= 500:
+                attempt += 1
+                logger.warning(f"Webhook returned {resp.status_code} (attempt {attempt}).")
+                await asyncio.sleep(2**attempt)
+                continue
+            if resp.is_error:
+                logger.error(f"Webhook rejected notification: {resp.status_code} {resp.text}")
+                return
+            logger.info(f"Notification sent via {notification.username}.")
+            return
+        logger.error(
+            f"Giving up on notification after {attempt} attempts and {rate_limited} rate limits."
+        )
+
+    def _request(self, notification: Notification) -> dict:
+        data = {"username": notification.username, "content": notification.content}
+        if notification.avatar_url:
+            data["avatar_url"] = notification.avatar_url
+        files = None
+        if notification.file is not None:
+            files = {"file": notification.file}
+        elif notification.diff is not None:
+            if len(notification.diff) < MAX_INLINE_DIFF:
+                data["content"] = f"{notification.content}\n```diff\n{notification.diff}\n```"
+            else:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"siak_schedule_diff_{timestamp}.txt"
+                files = {"file": (filename, notification.diff.encode("utf-8"), "text/plain")}
+        return {"data": data, "files": files}
+
+    def _update_rate_limit(self, webhook_url: str, resp: httpx.Response):
+        if resp.status_code == 429:
+            wait = self._retry_after(resp)
+        elif resp.headers.get("X-RateLimit-Remaining") == "0":
+            # Last request of the bucket. Wait for it to reset rather than hitting a 429.
+            wait = float(resp.headers.get("X-RateLimit-Reset-After", 0))
+        else:
+            return
+        self._blocked_until[webhook_url] = time.monotonic() + wait
+
+    @staticmethod
+    def _retry_after(resp: httpx.Response) -> float:
+        try:
+            return float(resp.json()["retry_after"])
+        except (ValueError, KeyError, TypeError):
+            pass
+        try:
+            return float(resp.headers.get("Retry-After", 1))
+        except ValueError:
+            return 1.0
+
+    def _load(self):
+        if not self.queue_file.exists():
+            return
+        try:
+            saved = json.loads(self.queue_file.read_text())
+            self.pending.extend(Notification.from_json(data) for data in saved)
+        except (ValueError, TypeError) as e:
+            logger.error(f"Could not restore {self.queue_file}: {e}")
+        self.queue_file.unlink()
+        if self.pending:
+            logger.info(f"Restored {len(self.pending)} pending notifications.")
+
+    def _save(self):
+        if not self.pending:
+            return
+        self.queue_file.parent.mkdir(parents=True, exist_ok=True)
+        self.queue_file.write_text(json.dumps([n.to_json() for n in self.pending]))
+        logger.info(f"Saved {len(self.pending)} pending notifications to {self.queue_file}.")
@@ -0,0 +1,83 @@
+"""Answer questions about the tracked schedule from the tracker's stores, as JSON.
+
+Runs on the latest snapshot in `data/schedule_*.db` through the stores' lookup indexes, so no
+page is fetched or parsed. Neither credentials nor a .env are needed.
+"""
+
+import argparse
+import json
+from pathlib import Path
+import sys
+import time
+
+from fazuh.warlock.store import ScheduleStore
+
+DATA_FOLDER = Path("data")
+
+
+def discover_stores(data_folder: Path = DATA_FOLDER) -> list[Path]:
+    """The tracker's stores, one per tracked URL (plus the single-URL store of old versions)."""
+    return sorted(data_folder.glob("schedule_*.db")) or sorted(data_folder.glob("schedule.db"))
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--db",
+        type=Path,
+        action="append",
+        help="Store to query. Repeatable. Defaults to every data/schedule_*.db.",
+    )
+    parser.add_argument("--indent", type=int, default=2, help="JSON indent. 0 for one line.")
+    commands = parser.add_subparsers(dest="query", required=True)
+
+    classes = commands.add_parser("classes", help="Find classes. Filters combine with AND.")
+    classes.add_argument("--code", help="Course code, e.g. CSGE601020")
+    classes.add_argument("--lecturer", help="Part of a lecturer name, case-insensitive")
+    classes.add_argument("--room", help="Room, e.g. D.109")
+    classes.add_argument("--day", help="Day, e.g. Rabu")
+    classes.add_argument("--at", help="Time during a meeting, e.g. 08.30")
+
+    conflicts = commands.add_parser("conflicts", help="Find overlapping meetings.")
+    conflicts.add_argument(
+        "--by",
+        choices=["room", "lecturer"],
+        default="room",
+        help="Overlaps in the same room, or with the same lecturer.",
+    )
+
+
+def run(args: argparse.Namespace) -> int:
+    paths = args.db or discover_stores()
+    if not paths:
+        print(
+            f"No schedule store found in {DATA_FOLDER}. Run `warlock track` first.", file=sys.stderr
+        )
+        return 1
+
+    start = time.perf_counter()
+    results = []
+    for path in paths:
+        if not path.exists():
+            print(f"{path} does not exist.", file=sys.stderr)
+            return 1
+        store = ScheduleStore(path)
+        try:
+            if args.query == "classes":
+                matches = store.find_classes(
+                    code=args.code, lecturer=args.lecturer, room=args.room, day=args.day, at=args.at
+                )
+            elif args.by == "room":
+                matches = store.room_conflicts()
+            else:
+                matches = store.lecturer_conflicts()
+            results.append({"url": store.get_meta("url"), "db": str(path), "results": matches})
+        finally:
+            store.close()
+
+    output = {
+        "query": args.query,
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+        "stores": results,
+    }
+    print(json.dumps(output, indent=args.indent or None, ensure_ascii=False))
+    return 0
@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime
+import random
+
+import httpx
+from loguru import logger
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from fazuh.warlock.config import Config
+from fazuh.warlock.metrics import Metrics
+
+# Metrics counters that mean the server is struggling. See `page_state.classify`.
+OVERLOAD_COUNTERS = ("page_high_load", "page_rejected", "page_inaccessible", "timeouts")
+TIMEOUT_ERRORS = (asyncio.TimeoutError, httpx.TimeoutException, PlaywrightTimeoutError)
+# Weight of the latest poll in the estimated change rate
+CHANGE_RATE_ALPHA = 0.3
+
+
+class PollScheduler:
+    """Decides how long to wait before the next poll.
+
+    - While a hot window (HOT_WINDOWS) is open, polls every HOT_INTERVAL seconds, and wakes
+      up early for a window that opens before the next poll.
+    - Otherwise, if `adaptive`, scales the interval between half and twice the configured
+      one depending on how often recent polls found changes.
+    - When the server is overloaded (high-load, rejected or inaccessible pages, timeouts),
+      backs off exponentially with jitter, up to BACKOFF_MAX seconds.
+
+    Overload is read from the process-wide metrics counters, so every poller backs off when
+    any of them sees the server struggling.
+    """
+
+    def __init__(self, name: str, adaptive: bool = True):
+        self.name = name
+        self.adaptive = adaptive
+        self.conf = Config()
+        self.metrics = Metrics()
+        self.change_rate = 0.5
+        self.overloads = 0  # Consecutive overloaded polls
+        self._overload_count = self._count_overloads()
+
+    def record(self, changed: bool | None = None):
+        """Record the outcome of a poll. `changed` is None if the poll could not tell."""
+        count = self._count_overloads()
+        overloaded = count > self._overload_count
+        self._overload_count = count
+        if overloaded:
+            self.overloads += 1
+            return
+        self.overloads = 0
+        if changed is not None and self.adaptive:
+            self.change_rate += CHANGE_RATE_ALPHA * (float(changed) - self.change_rate)
+
+    def next_delay(self, interval: float, now: datetime | None = None) -> float:
+        """Seconds to wait before the next poll, given the configured `interval`."""
+        now = now or datetime.now()
+        window = next((w for w in self.conf.hot_windows if w[0] <= now < w[1]), None)
+        if window is not None:
+            target = self.conf.hot_interval
+            reason = f"hot window until {window[1]:%Y-%m-%d %H:%M}"
+        elif self.adaptive:
+            # 2x the interval when nothing changes, 1/2x when every poll finds changes
+            target = interval * 2 ** (1 - 2 * self.change_rate)
+            reason = f"change rate {self.change_rate:.2f}"
+        else:
+            target = interval
+            reason = "fixed interval"
+
+        if self.overloads:
+            delay = self.backoff(target)
+            reason = f"server overloaded {self.overloads}x in a row, backing off"
+        else:
+            delay = target * random.uniform(0.9, 1.1)
+            if window is None:
+                upcoming = [start for start, _ in self.conf.hot_windows if start > now]
+                if upcoming and (min(upcoming) - now).total_seconds() < delay:
+                    delay = (min(upcoming) - now).total_seconds()
+                    reason = f"hot window opens at {min(upcoming):%Y-%m-%d %H:%M}"
+
+        logger.info(f"{self.name}: next poll in {delay:.1f} seconds ({reason}).")
+        return delay
+
+    def backoff(self, target: float) -> float:
+        """`target` seconds, backed off exponentially with jitter while the server is overloaded."""
+        if not self.overloads:
+            return target
+        cap = max(self.conf.backoff_max, target)
+        return random.uniform(0.5, 1) * min(cap, target * 2**self.overloads)
+
+    async def wait(self, interval: float):
+        await asyncio.sleep(self.next_delay(interval))
+
+    def _count_overloads(self) -> int:
+        return sum(self.metrics.counters.get(name, 0) for name in OVERLOAD_COUNTERS)
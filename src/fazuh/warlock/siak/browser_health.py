@@ -0,0 +1,153 @@
+from collections import defaultdict
+from dataclasses import dataclass
+import os
+from pathlib import Path
+import time
+
+from loguru import logger
+
+from fazuh.warlock.config import Config
+from fazuh.warlock.metrics import Metrics
+from fazuh.warlock.siak.siak import Siak
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Seconds between samples, however often `check` is called
+SAMPLE_INTERVAL = 60
+MB = 1024 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class BrowserStats:
+    """One sample of the browser's footprint. RSS is None where it cannot be read."""
+
+    rss: int | None  # Bytes, over every process the browser spawned
+    renderer_rss: int | None
+    processes: int
+    renderers: int
+    contexts: int
+    pages: int
+    age: float  # Seconds since launch
+    navigations: int
+
+    def __str__(self) -> str:
+        rss = "unknown" if self.rss is None else f"{self.rss / MB:.0f} MB"
+        renderer_rss = "" if self.renderer_rss is None else f" {self.renderer_rss / MB:.0f} MB"
+        return (
+            f"RSS {rss} in {self.processes} processes ({self.renderers} renderers{renderer_rss}),"
+            f" {self.contexts} contexts, {self.pages} pages, age {self.age / 3600:.1f} h,"
+            f" {self.navigations} navigations"
+        )
+
+
+class BrowserHealth:
+    """Watches a long-running `Siak` browser and relaunches it before it grows too large.
+
+    The browser is recycled once it exceeds BROWSER_MAX_RSS_MB, BROWSER_MAX_AGE seconds or
+    BROWSER_MAX_NAVIGATIONS page loads (0 disables a limit). The session carries over, so no
+    login is needed. RSS is read with psutil if installed, otherwise from /proc.
+    """
+
+    def __init__(self, siak: Siak):
+        self.siak = siak
+        self.conf = Config()
+        self.metrics = Metrics()
+        self._sampled_at = float("-inf")
+
+    async def check(self, force: bool = False) -> BrowserStats | None:
+        """Sample the browser, logging its stats, and recycle it if a limit is exceeded.
+
+        Samples at most every SAMPLE_INTERVAL seconds unless `force`, which also recycles it
+        regardless of the limits, e.g. after an error left it in an unknown state.
+        """
+        if not self.siak.is_connected():
+            return None
+        if not force and time.monotonic() - self._sampled_at < SAMPLE_INTERVAL:
+            return None
+        self._sampled_at = time.monotonic()
+
+        stats = self.sample()
+        logger.info(f"Browser health: {stats}.")
+        reason = "recovering from an error" if force else self._exceeded(stats)
+        if reason is not None:
+            logger.warning(f"Recycling the browser ({reason}).")
+            await self.siak.recycle_browser()
+            self.metrics.inc("browser_recycles")
+            logger.info(f"Browser recycled. Now: {self.sample()}.")
+        return stats
+
+    def sample(self) -> BrowserStats:
+        contexts = self.siak.browser.contexts if self.siak.is_connected() else []
+        processes = _browser_processes()
+        rss = renderer_rss = None
+        if processes is not None:
+            rss = sum(rss for rss, _ in processes)
+            renderer_rss = sum(rss for rss, is_renderer in processes if is_renderer)
+        return BrowserStats(
+            rss=rss,
+            renderer_rss=renderer_rss,
+            processes=len(processes or ()),
+            renderers=sum(1 for _, is_renderer in processes or () if is_renderer),
+            contexts=len(contexts),
+            pages=sum(len(context.pages) for context in contexts),
+            age=time.monotonic() - self.siak.launched_at,
+            navigations=self.siak.navigations,
+        )
+
+    def _exceeded(self, stats: BrowserStats) -> str | None:
+        max_rss = self.conf.browser_max_rss_mb * MB
+        if max_rss and stats.rss is not None and stats.rss > max_rss:
+            return f"RSS over {self.conf.browser_max_rss_mb} MB"
+        if self.conf.browser_max_age and stats.age > self.conf.browser_max_age:
+            return f"older than {self.conf.browser_max_age:.0f} seconds"
+        max_navigations = self.conf.browser_max_navigations
+        if max_navigations and stats.navigations > max_navigations:
+            return f"over {max_navigations} navigations"
+        return None
+
+
+def _browser_processes() -> list[tuple[int, bool]] | None:
+    """(RSS, is renderer) of every process below this one, i.e. the Playwright driver and
+    the browsers it launched. None if processes cannot be inspected here.
+    """
+    if psutil is not None:
+        processes = []
+        for process in psutil.Process().children(recursive=True):
+            try:
+                is_renderer = "--type=renderer" in process.cmdline()
+                processes.append((process.memory_info().rss, is_renderer))
+            except psutil.Error:
+                continue  # Exited while sampling
+        return processes
+
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+    children = defaultdict(list)
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # The command name in parentheses may contain spaces, so split after it
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children[ppid].append(entry)
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    processes = []
+    pending = list(children[os.getpid()])
+    while pending:
+        entry = pending.pop()
+        pending.extend(children[int(entry.name)])
+        try:
+            rss = int((entry / "statm").read_text().split()[1]) * page_size
+            is_renderer = b"--type=renderer" in (entry / "cmdline").read_bytes()
+        except OSError:
+            continue
+        processes.append((rss, is_renderer))
+    return processes
@@ -0,0 +1,350 @@
+import asyncio
+import hashlib
+from io import BytesIO
+import json
+from pathlib import Path
+import re
+import sys
+import threading
+from typing import Self
+
+from loguru import logger
+
+from fazuh.warlock.config import Config
+from fazuh.warlock.metrics import Metrics
+
+try:
+    from PIL import Image
+    import pytesseract
+except ImportError:
+    Image = pytesseract = None
+
+CAPTCHA_DIR = Path("data/captcha")
+# How often the file solver looks for an answer file
+POLL_INTERVAL = 0.5
+# Answers kept for repeated images. The oldest is forgotten first.
+MAX_CACHED = 1024
+
+
+def image_key(image: bytes) -> str:
+    """Identify a CAPTCHA image by its content."""
+    return hashlib.sha256(image).hexdigest()[:16]
+
+
+class StdinSolver:
+    """Asks in the terminal. Prompts are shown one at a time.
+
+    Lines are read by a single long-lived thread, so a prompt given up on (timed out, or
+    answered elsewhere) never leaves a read behind that would take the next prompt's answer.
+    """
+
+    name = "stdin"
+    human = True
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._reader: threading.Thread | None = None
+        self._closed = False  # Set at the end of input
+        # Where the reader delivers lines: the loop and queue of the latest prompt
+        self._target: tuple[asyncio.AbstractEventLoop, asyncio.Queue[str | None]] | None = None
+
+    def hint(self, key: str) -> str:
+        return "in the terminal"
+
+    async def solve(self, image: bytes, key: str) -> str:
+        async with self._lock:
+            if self._closed:
+                raise EOFError("The terminal is closed.")
+            path = _save_image(image, key)
+            loop = asyncio.get_running_loop()
+            if self._target is None or self._target[0] is not loop:
+                self._target = (loop, asyncio.Queue())
+            lines = self._target[1]
+            while not lines.empty():
+                lines.get_nowait()  # Typed for an earlier prompt
+            if self._reader is None:
+                self._reader = threading.Thread(target=self._read, name="captcha-stdin")
+                self._reader.daemon = True  # Blocked in readline until the next line
+                self._reader.start()
+
+            print(f"Please enter the CAPTCHA code from the image at {path}: ", end="", flush=True)
+            line = await lines.get()
+            if line is None:
+                raise EOFError("The terminal is closed.")
+            return line
+
+    def _read(self):
+        while True:
+            line = sys.stdin.readline()
+            loop, lines = self._target
+            try:
+                # "" at end of input
+                loop.call_soon_threadsafe(lines.put_nowait, line.rstrip("\n") if line else None)
+            except RuntimeError:
+                pass  # The loop has closed. A new prompt gets a new one.
+            if not line:
+                self._closed = True
+                return
+
+    async def close(self):
+        pass
+
+
+class FileSolver:
+    """Saves the image as data/captcha/<key>.png and waits for an answer in <key>.txt."""
+
+    name = "file"
+    human = True
+
+    def hint(self, key: str) -> str:
+        return f"by writing it to {CAPTCHA_DIR / key}.txt"
+
+    async def solve(self, image: bytes, key: str) -> str:
+        image_path = _save_image(image, key)
+        answer_path = CAPTCHA_DIR / f"{key}.txt"
+        try:
+            while not answer_path.exists():
+                await asyncio.sleep(POLL_INTERVAL)
+            return answer_path.read_text().strip()
+        finally:
+            image_path.unlink(missing_ok=True)
+            answer_path.unlink(missing_ok=True)
+
+    async def close(self):
+        pass
+
+
+class HttpSolver:
+    """Takes answers over a small local HTTP endpoint.
+
+    - `GET /` lists the keys of the CAPTCHAs waiting for an answer, as JSON.
+    - `GET /<key>.png` returns the image.
+    - `POST /<key>` with the answer as the body solves it.
+    """
+
+    name = "http"
+    human = True
+
+    def __init__(self, port: int, host: str = "127.0.0.1"):
+        self.host = host
+        self.port = port
+        self._server: asyncio.Server | None = None
+        self._lock = asyncio.Lock()  # Starts the server once
+        self._pending: dict[str, tuple[bytes, asyncio.Future[str]]] = {}
+
+    def hint(self, key: str) -> str:
+        return f"by POSTing it to http://{self.host}:{self.port}/{key}"
+
+    async def solve(self, image: bytes, key: str) -> str:
+        async with self._lock:
+            if self._server is None:
+                self._server = await asyncio.start_server(self._handle, self.host, self.port)
+                self.port = self._server.sockets[0].getsockname()[1]  # In case port 0 was asked
+                logger.info(f"Taking CAPTCHA answers on http://{self.host}:{self.port}/")
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = (image, future)
+        try:
+            return await future
+        finally:
+            self._pending.pop(key, None)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            method, target, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+            length = 0
+            while line := (await reader.readline()).strip():
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            body = await reader.readexactly(length) if length else b""
+
+            key = target.strip("/").removesuffix(".png")
+            pending = self._pending.get(key)
+            if method == "GET" and not key:
+                status, content_type = 200, "application/json"
+                body = json.dumps(sorted(self._pending)).encode("utf-8")
+            elif pending is None:
+                status, content_type, body = 404, "text/plain", b"No such CAPTCHA\n"
+            elif method == "GET":
+                status, content_type, body = 200, "image/png", pending[0]
+            elif method == "POST" and body.strip():
+                if not pending[1].done():
+                    pending[1].set_result(body.decode("utf-8").strip())
+                status, content_type, body = 200, "text/plain", b"OK\n"
+            else:
+                status, content_type, body = 400, "text/plain", b"POST the answer as the body\n"
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode("ascii")
+                + body
+            )
+            await writer.drain()
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class OcrSolver:
+    """Reads the code with a local Tesseract install (the optional pytesseract and Pillow)."""
+
+    name = "ocr"
+    human = False
+
+    def hint(self, key: str) -> str:
+        return "by OCR"
+
+    async def solve(self, image: bytes, key: str) -> str:
+        if pytesseract is None:
+            raise RuntimeError("OCR needs the pytesseract and Pillow packages.")
+        text = await asyncio.to_thread(
+            pytesseract.image_to_string, Image.open(BytesIO(image)), config="--psm 7"
+        )
+        return re.sub(r"[^0-9A-Za-z]", "", text)
+
+    async def close(self):
+        pass
+
+
+class CaptchaSolver:
+    """Solves CAPTCHA images with the backends of CAPTCHA_SOLVER.
+
+    Automatic backends (OCR) are tried first, one at a time in the configured order. If none
+    gives an answer, every human backend (terminal, file, HTTP) is asked at once, and the first
+    answer wins and withdraws the other prompts.
+
+    Waiting never blocks the event loop, so concurrent sessions can wait on different images.
+    Sessions shown the same image share one solving attempt, and answers are cached by image
+    hash so a repeated image is answered at once. An answer the server rejected should be
+    dropped with `invalidate`.
+    """
+
+    _instance: Self | None = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super(CaptchaSolver, cls).__new__(cls)
+            cls._instance.conf = Config()
+            cls._instance.metrics = Metrics()
+            cls._instance.backends = []
+            cls._instance._settings = None  # (solvers, port) the backends were built for
+            cls._instance._answers = {}  # Image key -> answer
+            cls._instance._pending = {}  # Image key -> solving task
+        return cls._instance
+
+    async def solve(self, image: bytes) -> str:
+        """The answer to the CAPTCHA `image`. Raises TimeoutError after CAPTCHA_TIMEOUT."""
+        key = image_key(image)
+        if (answer := self._answers.get(key)) is not None:
+            self.metrics.inc("captcha_cache_hits")
+            logger.info(f"CAPTCHA {key} was answered before. Reusing the answer.")
+            return answer
+        task = self._pending.get(key)
+        if task is None:
+            task = self._pending[key] = asyncio.create_task(self._solve(image, key))
+        # One waiter giving up must not cancel the attempt for the others
+        return await asyncio.shield(task)
+
+    def invalidate(self, image: bytes):
+        """Forget the answer to `image`, e.g. after the server rejected it."""
+        if self._answers.pop(image_key(image), None) is not None:
+            self.metrics.inc("captcha_wrong_answers")
+
+    def is_cached(self, image: bytes) -> bool:
+        return image_key(image) in self._answers
+
+    def hint(self, image: bytes) -> str:
+        """Where the answer to `image` is expected, for the admin notification."""
+        key = image_key(image)
+        return ", or ".join(backend.hint(key) for backend in self._backends())
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.close()
+
+    async def _solve(self, image: bytes, key: str) -> str:
+        try:
+            async with asyncio.timeout(self.conf.captcha_timeout):
+                backends = self._backends()
+                stages = [[backend] for backend in backends if not backend.human]
+                if humans := [backend for backend in backends if backend.human]:
+                    stages.append(humans)
+                for stage in stages:
+                    if (answer := await self._first_answer(stage, image, key)) is not None:
+                        self._cache(key, answer)
+                        return answer
+            raise RuntimeError("No CAPTCHA solver gave an answer.")
+        finally:
+            self._pending.pop(key, None)
+
+    async def _first_answer(self, backends: list, image: bytes, key: str) -> str | None:
+        """Ask `backends` at once and return the first answer, cancelling the others. None if
+        every one of them failed or gave no answer.
+        """
+        tasks = {asyncio.create_task(backend.solve(image, key)): backend for backend in backends}
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    backend = tasks.pop(task)
+                    try:
+                        answer = task.result().strip()
+                    except Exception as e:
+                        logger.warning(f"CAPTCHA solver {backend.name} failed: {e}")
+                        continue
+                    if answer:
+                        logger.info(f"CAPTCHA {key} solved by {backend.name}.")
+                        return answer
+                    logger.warning(f"CAPTCHA solver {backend.name} gave no answer.")
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let them clean up, e.g. the file solver removes its image
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _cache(self, key: str, answer: str):
+        if len(self._answers) >= MAX_CACHED:
+            del self._answers[next(iter(self._answers))]
+        self._answers[key] = answer
+
+    def _backends(self) -> list:
+        """The configured backends. Rebuilt when CAPTCHA_SOLVER or CAPTCHA_PORT changes."""
+        settings = (self.conf.captcha_solvers, self.conf.captcha_port)
+        if settings == self._settings:
+            return self.backends
+
+        self._settings = settings
+        for backend in self.backends:
+            asyncio.ensure_future(backend.close())
+        self.backends = []
+        for name in self.conf.captcha_solvers:
+            match name:
+                case "stdin":
+                    self.backends.append(StdinSolver())
+                case "file":
+                    self.backends.append(FileSolver())
+                case "http":
+                    self.backends.append(HttpSolver(self.conf.captcha_port))
+                case "ocr":
+                    if pytesseract is None:
+                        logger.error("The ocr CAPTCHA solver needs pytesseract and Pillow.")
+                    else:
+                        self.backends.append(OcrSolver())
+                case _:
+                    logger.error(f"Unknown CAPTCHA solver: {name}.")
+        return self.backends
+
+
+def _save_image(image: bytes, key: str) -> Path:
+    CAPTCHA_DIR.mkdir(parents=True, exist_ok=True)
+    path = CAPTCHA_DIR / f"{key}.png"
+    path.write_bytes(image)
+    return path
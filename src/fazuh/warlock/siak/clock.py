@@ -0,0 +1,58 @@
+from email.utils import parsedate_to_datetime
+import time
+
+
+class ServerClock:
+    """Estimates the server's clock from the HTTP `Date` headers of its responses.
+
+    A `Date` header only has one-second resolution, but it was stamped somewhere between
+    sending the request and receiving the response. Each response therefore bounds the
+    offset (server time - local time). Intersecting the bounds of many responses narrows the
+    estimate well below a second.
+    """
+
+    def __init__(self):
+        self.lower = float("-inf")
+        self.upper = float("inf")
+        self.samples = 0
+
+    def observe(self, date: str | None, sent_at: float, received_at: float):
+        """Add a response's `Date` header, with the local `time.time()` around the request."""
+        if not date:
+            return
+        try:
+            server_time = parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError):
+            return
+        # The server stamped a time in [server_time, server_time + 1) during the request
+        lower = server_time - received_at
+        upper = server_time + 1 - sent_at
+        if lower > self.upper or upper < self.lower:
+            # Inconsistent with what we knew, e.g. either clock was adjusted. Start over.
+            self.lower, self.upper, self.samples = lower, upper, 0
+        else:
+            self.lower = max(self.lower, lower)
+            self.upper = min(self.upper, upper)
+        self.samples += 1
+
+    @property
+    def is_synced(self) -> bool:
+        return self.samples > 0
+
+    @property
+    def offset(self) -> float:
+        """Seconds to add to local time to get server time. 0 until a response is observed."""
+        if not self.is_synced:
+            return 0.0
+        return (self.lower + self.upper) / 2
+
+    @property
+    def uncertainty(self) -> float:
+        """Half the width of the offset's bounds, in seconds."""
+        if not self.is_synced:
+            return float("inf")
+        return (self.upper - self.lower) / 2
+
+    def now(self) -> float:
+        """The estimated server time, as a Unix timestamp."""
+        return time.time() + self.offset
@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Mapping
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from bs4 import Tag
+
+SUBMIT_VALUE = "Simpan IRS"
+
+
+@dataclass(frozen=True, slots=True)
+class CourseRow:
+    """A class row of the CoursePlanEdit table."""
+
+    index: int  # Position among the page's <tr> elements
+    course: str
+    prof: str
+    radio_name: str | None = None
+    radio_value: str | None = None
+
+
+def match_courses(
+    rows: list[CourseRow], courses: Mapping[str, str]
+) -> tuple[list[CourseRow], dict[str, str]]:
+    """Pick one row per `courses` entry ("course": "prof", case-insensitive substrings).
+
+    Returns the selected rows and the entries that matched no selectable row.
+    """
+    remaining = {key: (key.lower(), val.lower()) for key, val in courses.items()}
+    selected = []
+    for row in rows:
+        if not remaining:
+            break
+        if row.radio_name is None:
+            continue
+        course = row.course.lower()
+        prof = row.prof.lower()
+        for key, (course_key, prof_key) in remaining.items():
+            if course_key in course and prof_key in prof:
+                selected.append(row)
+                del remaining[key]
+                break
+    return selected, {key: courses[key] for key in remaining}
+
+
+@dataclass(slots=True)
+class CoursePlanForm:
+    """The IRS form of CoursePlanEdit, as needed to submit it without a browser."""
+
+    action: str
+    # Every successful control except radios and the submit button, in document order
+    fields: list[tuple[str, str]] = field(default_factory=list)
+    # Radio group name -> value checked when the page was served
+    checked: dict[str, str] = field(default_factory=dict)
+    submit: tuple[str, str] | None = None
+    rows: list[CourseRow] = field(default_factory=list)
+
+    def payload(self, selected: list[CourseRow]) -> list[tuple[str, str]]:
+        """Form data that submits the IRS with `selected` rows checked."""
+        radios = dict(self.checked)
+        for row in selected:
+            radios[row.radio_name] = row.radio_value
+        payload = self.fields + list(radios.items())
+        if self.submit:
+            payload.append(self.submit)
+        return payload
+
+
+def parse_course_plan(content: str, url: str) -> CoursePlanForm | None:
+    """Parse the IRS form of the CoursePlanEdit page at `url`.
+
+    Returns None if the page does not have the expected shape (a POST form with a
+    "Simpan IRS" submit button and radio-selectable class rows).
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    button = soup.find("input", attrs={"type": "submit", "value": SUBMIT_VALUE})
+    form = button.find_parent("form") if button else None
+    if form is None or form.get("method", "get").lower() != "post":
+        return None
+
+    plan = CoursePlanForm(action=urljoin(url, form.get("action") or url))
+    if button.get("name"):
+        plan.submit = (button["name"], button.get("value", ""))
+
+    for control in form.find_all(("input", "select", "textarea")):
+        name = control.get("name")
+        if not name or control.has_attr("disabled"):
+            continue
+        if control.name == "select":
+            option = control.find("option", selected=True) or control.find("option")
+            if option is not None:
+                plan.fields.append((name, option.get("value", option.get_text())))
+        elif control.name == "textarea":
+            plan.fields.append((name, control.get_text()))
+        else:
+            kind = control.get("type", "text").lower()
+            if kind == "radio":
+                if control.has_attr("checked"):
+                    plan.checked[name] = control.get("value", "on")
+            elif kind == "checkbox":
+                if control.has_attr("checked"):
+                    plan.fields.append((name, control.get("value", "on")))
+            elif kind not in ("submit", "button", "image", "reset", "file"):
+                plan.fields.append((name, control.get("value", "")))
+
+    # Same rows as the browser path: any <tr> with a course label and a 9th-column lecturer cell
+    for index, tr in enumerate(soup.find_all("tr")):
+        label = tr.find("label")
+        prof = tr.select_one("td:nth-child(9)")
+        if label is None or prof is None:
+            continue
+        radio = tr.find("input", attrs={"type": "radio"})
+        plan.rows.append(
+            CourseRow(
+                index=index,
+                course=label.get_text(" ", strip=True),
+                prof=prof.get_text(" ", strip=True),
+                radio_name=radio.get("name") if isinstance(radio, Tag) else None,
+                radio_value=radio.get("value", "on") if isinstance(radio, Tag) else None,
+            )
+        )
+
+    if not any(row.radio_name for row in plan.rows):
+        return None
+    return plan
@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from dataclasses import field
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+USERNAME_FIELD = "u"
+PASSWORD_FIELD = "p"
+
+
+@dataclass(slots=True)
+class LoginForm:
+    """The SIAK login form, as needed to log in without a browser."""
+
+    action: str
+    # Every other control with a value (hidden tokens, the submit button), in document order
+    fields: list[tuple[str, str]] = field(default_factory=list)
+
+    def payload(self, username: str, password: str) -> list[tuple[str, str]]:
+        """Form data that logs in as `username`."""
+        return [(USERNAME_FIELD, username), (PASSWORD_FIELD, password), *self.fields]
+
+
+def parse_login_form(content: str, url: str) -> LoginForm | None:
+    """Parse the login form of the Authentication page at `url`.
+
+    Returns None if the page has no POST form with the username and password fields.
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    username = soup.find("input", attrs={"name": USERNAME_FIELD})
+    form = username.find_parent("form") if username else None
+    if form is None or form.get("method", "get").lower() != "post":
+        return None
+    if form.find("input", attrs={"name": PASSWORD_FIELD}) is None:
+        return None
+
+    login = LoginForm(action=urljoin(url, form.get("action") or url))
+    for control in form.find_all("input"):
+        name = control.get("name")
+        if not name or name in (USERNAME_FIELD, PASSWORD_FIELD) or control.has_attr("disabled"):
+            continue
+        if control.get("type", "text").lower() in ("button", "image", "reset", "file"):
+            continue
+        login.fields.append((name, control.get("value", "")))
+    return login
@@ -0,0 +1,58 @@
+from enum import Enum
+
+from fazuh.warlock.metrics import Metrics
+from fazuh.warlock.siak.path import Path
+
+# Shown with a new CAPTCHA after a wrong answer
+INVALID_CAPTCHA_KEYWORD = "You have entered an invalid answer"
+CAPTCHA_KEYWORDS = (
+    "This question is for testing whether you are a human visitor",
+    "What code is in the image?",
+    INVALID_CAPTCHA_KEYWORD,
+)
+REJECTED_KEYWORD = "The requested URL was rejected"
+# Maaf, server SIAKNG sedang mengalami load tinggi dan belum dapat melayani request Anda saat ini.
+# Silahkan mencoba beberapa saat lagi.
+HIGH_LOAD_KEYWORD = "Silahkan mencoba beberapa saat lagi."
+INACCESSIBLE_KEYWORD = "Silakan mencoba beberapa saat lagi."
+REGISTRATION_CLOSED_KEYWORD = (
+    "Anda tidak dapat mengisi IRS karena periode registrasi akademik belum dimulai"
+)
+
+
+class PageState(Enum):
+    OK = "ok"
+    LOGIN = "login"
+    CAPTCHA = "captcha"
+    REJECTED = "rejected"
+    HIGH_LOAD = "high_load"
+    INACCESSIBLE = "inaccessible"
+    REGISTRATION_CLOSED = "registration_closed"
+
+
+def classify(content: str, url: str, status_code: int | None = None) -> PageState:
+    """Classify a SIAK page from one snapshot of its HTML, URL and HTTP status if known.
+
+    Every page that is not OK is counted, e.g. as the "page_high_load" metric. A 5xx response
+    is INACCESSIBLE, so it counts towards backing off like the server's own overload pages.
+    """
+    state = _classify(content, url, status_code)
+    if state is not PageState.OK:
+        Metrics().inc(f"page_{state.value}")
+    return state
+
+
+def _classify(content: str, url: str, status_code: int | None) -> PageState:
+    if any(keyword in content for keyword in CAPTCHA_KEYWORDS):
+        return PageState.CAPTCHA
+    if REJECTED_KEYWORD in content:
+        return PageState.REJECTED
+    if HIGH_LOAD_KEYWORD in content:
+        return PageState.HIGH_LOAD
+    if INACCESSIBLE_KEYWORD in content or (status_code or 0) >= 500:
+        return PageState.INACCESSIBLE
+    if url.split("?", 1)[0] == Path.AUTHENTICATION:
+        return PageState.LOGIN
+    if REGISTRATION_CLOSED_KEYWORD in content:
+        return PageState.REGISTRATION_CLOSED
+    return PageState.OK
@@ -4,3 +4,12 @@ class Path:
     CHANGE_ROLE = f"{HOSTNAME}main/Authentication/ChangeRole/"
     WELCOME = f"{HOSTNAME}main/Welcome/"
     COURSE_PLAN_EDIT = f"{HOSTNAME}main/CoursePlan/CoursePlanEdit"
+
+    @classmethod
+    def set_hostname(cls, hostname: str):
+        """Point every path at another host, e.g. a local stand-in server."""
+        cls.HOSTNAME = hostname.rstrip("/") + "/"
+        cls.AUTHENTICATION = f"{cls.HOSTNAME}main/Authentication/"
+        cls.CHANGE_ROLE = f"{cls.HOSTNAME}main/Authentication/ChangeRole/"
+        cls.WELCOME = f"{cls.HOSTNAME}main/Welcome/"
+        cls.COURSE_PLAN_EDIT = f"{cls.HOSTNAME}main/CoursePlan/CoursePlanEdit"
@@ -0,0 +1,180 @@
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Callable
+
+
+@dataclass(frozen=True, slots=True)
+class ClassSection:
+    """One class row of a course on the Schedule page.
+
+    Multi-line cells (schedule, room, lecturers) keep one entry per line.
+    """
+
+    name: str
+    language: str = ""
+    period: str = ""
+    schedule: tuple[str, ...] = ()
+    room: tuple[str, ...] = ()
+    lecturers: tuple[str, ...] = ()
+
+    FIELDS = ("language", "period", "schedule", "room", "lecturers")
+
+    @classmethod
+    def from_cells(cls, cells: list[tuple[str, ...]]) -> "ClassSection":
+        """Build from the text parts of each <td>, without the leading index cell.
+
+        Cells past the sixth, e.g. of a table nested in a cell, are kept in `lecturers` behind
+        a "; ", so `to_line` still shows every cell.
+        """
+        cells = cells + [()] * (6 - len(cells))
+        name, language, period, schedule, room, lecturers, *extra = cells
+        return cls(
+            name="".join(name),
+            language="".join(language),
+            period="".join(period),
+            schedule=tuple(schedule),
+            room=tuple(room),
+            lecturers=(*lecturers, *("; " + "".join(cell) for cell in extra)),
+        )
+
+    @classmethod
+    def from_line(cls, line: str) -> "ClassSection":
+        """Inverse of `to_line`. Line breaks inside cells are lost."""
+        parts = line.split("; ", 5)
+        parts += [""] * (6 - len(parts))
+        name, language, period, schedule, room, lecturers = parts
+        return cls(
+            name=name,
+            language=language,
+            period=period,
+            schedule=(schedule,) if schedule else (),
+            room=(room,) if room else (),
+            lecturers=(lecturers,) if lecturers else (),
+        )
+
+    def to_line(self) -> str:
+        # e.g. "Kelas Teori Matriks (A); Indonesia; 25/08/2025 - 19/12/2025; Rabu, 08.00-09.40; D.109; - Dra. ..."
+        return "; ".join(
+            (
+                self.name,
+                self.language,
+                self.period,
+                "".join(self.schedule),
+                "".join(self.room),
+                "".join(self.lecturers),
+            )
+        )
+
+    def text(self, name: str) -> str:
+        """Human readable value of a field."""
+        value = getattr(self, name)
+        return ", ".join(value) if isinstance(value, tuple) else value
+
+
+@dataclass(slots=True)
+class Course:
+    """A course header and its classes, keyed by class name."""
+
+    code: str
+    title: str
+    classes: dict[str, ClassSection] = field(default_factory=dict)
+
+    @classmethod
+    def from_header(cls, title: str, classes: list[ClassSection]) -> "Course":
+        # e.g. "CSGE601020 - Dasar-Dasar Pemrograman 1 (4 SKS, Term 1); Kurikulum 01.00.12.01-2020"
+        code = title.split(" - ", 1)[0]
+        return cls(code=code, title=title, classes=_index(classes, lambda c: c.name))
+
+    @property
+    def key(self) -> str:
+        """Course code and curriculum, e.g. "CSGE601020; Kurikulum 01.00.12.01-2020".
+
+        A course offered under several curricula has one header per curriculum.
+        """
+        _, sep, curriculum = self.title.rpartition("; ")
+        return f"{self.code}; {curriculum}" if sep else self.code
+
+    @classmethod
+    def from_line(cls, line: str) -> "Course":
+        """Inverse of `to_line`."""
+        title, _, classes = line.partition(": | ")
+        return cls.from_header(
+            title, [ClassSection.from_line(c) for c in classes.split(" | ")] if classes else []
+        )
+
+    def to_line(self) -> str:
+        """One `course: | class | class` line, the format of data/latest_courses.txt."""
+        if not self.classes:
+            return self.title
+        return f"{self.title}: | " + " | ".join(c.to_line() for c in self.classes.values())
+
+
+def index_courses(courses: list[Course]) -> dict[str, Course]:
+    """Index courses by `Course.key`, so a course keeps its key when others come and go.
+
+    Repeated keys, e.g. the same header listed twice, get a "#n" suffix.
+    """
+    return _index(courses, lambda c: c.key)
+
+
+def diff_courses(old: dict[str, Course], new: dict[str, Course]) -> list[str]:
+    """Diff two course indexes, reporting only what changed.
+
+    Added and removed courses are reported as whole `+`/`-` lines. For a course that exists
+    in both, only its added/removed classes and the changed fields of its classes are listed,
+    e.g. "~ Kelas A: room D.109 → D.201".
+    """
+    changes = []
+    for key in sorted(old.keys() | new.keys()):
+        before = old.get(key)
+        after = new.get(key)
+        if before is None:
+            changes.append(f"+ {after.to_line()}")
+        elif after is None:
+            changes.append(f"- {before.to_line()}")
+        else:
+            course_changes = _diff_course(before, after)
+            if course_changes:
+                changes.append(f"@@ {after.title} @@")
+                changes.extend(course_changes)
+    return changes
+
+
+def _diff_course(old: Course, new: Course) -> list[str]:
+    changes = []
+    if old.title != new.title:
+        changes.append(f"~ {old.title} → {new.title}")
+    for key in sorted(old.classes.keys() | new.classes.keys()):
+        before = old.classes.get(key)
+        after = new.classes.get(key)
+        if before is None:
+            changes.append(f"+ {after.to_line()}")
+        elif after is None:
+            changes.append(f"- {before.to_line()}")
+        else:
+            fields = [
+                f"{name} {before.text(name)} → {after.text(name)}"
+                for name in ClassSection.FIELDS
+                # Compare as flattened text so snapshots restored with from_line still match
+                if _flat(before, name) != _flat(after, name)
+            ]
+            if fields:
+                changes.append(f"~ {after.name}: " + "; ".join(fields))
+    return changes
+
+
+def _flat(section: ClassSection, name: str) -> str:
+    value = getattr(section, name)
+    return "".join(value) if isinstance(value, tuple) else value
+
+
+def _index(items: list, key: Callable[..., str]) -> dict:
+    index = {}
+    for item in items:
+        k = key(item)
+        n = 1
+        while k in index:
+            n += 1
+            k = f"{key(item)}#{n}"
+        index[k] = item
+    return index
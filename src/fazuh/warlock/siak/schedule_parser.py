@@ -0,0 +1,315 @@
+from collections import Counter
+import hashlib
+from html.parser import HTMLParser
+import re
+
+from bs4 import BeautifulSoup
+
+from fazuh.warlock.siak.schedule import ClassSection
+from fazuh.warlock.siak.schedule import Course
+
+# Every course on the Schedule page starts with <th class="sub border2 pad2">
+COURSE_HEADER_CLASSES = ("sub", "border2", "pad2")
+
+# Elements that never have children or a closing tag
+VOID_ELEMENTS = frozenset(
+    (
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "param",
+        "source",
+        "track",
+        "wbr",
+    )
+)
+
+# Elements whose text is not part of get_text()
+RAW_TEXT_ELEMENTS = frozenset(("script", "style", "template"))
+
+# Markup that changes between requests without the schedule changing: scripts, comments,
+# hidden form fields (CSRF tokens), meta tags and clock times (e.g. "generated at 10:21:09")
+VOLATILE_MARKUP = re.compile(
+    r"<script\b.*?</script>"
+    r"|<style\b.*?</style>"
+    r"|<!--.*?-->"
+    r"|<input\b[^>]*\btype=[\"']?hidden\b[^>]*>"
+    r"|<meta\b[^>]*>"
+    r"|\b\d{1,2}:\d{2}:\d{2}\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def fingerprint(content: str) -> str:
+    """Hash of the Schedule page with volatile markup removed.
+
+    Equal fingerprints mean the parsed schedule is equal, so parsing can be skipped.
+    """
+    normalized = VOLATILE_MARKUP.sub("", content)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def parse_schedule(content: str) -> list[str]:
+    """Extract one `course: | class | class` line per course from the Schedule page.
+
+    Single linear pass over the markup. Output is identical to `parse_schedule_soup`.
+    """
+    parser = ScheduleParser()
+    parser.feed(content)
+    parser.close()
+    return parser.lines()
+
+
+def parse_courses(content: str) -> list[Course]:
+    """Extract the courses and their classes from the Schedule page."""
+    parser = ScheduleParser()
+    parser.feed(content)
+    parser.close()
+    return parser.courses()
+
+
+def parse_schedule_soup(content: str) -> list[str]:
+    """Reference BeautifulSoup implementation of `parse_schedule`."""
+    soup = BeautifulSoup(content, "html.parser")
+
+    courses: list[str] = []
+
+    for hdr in soup.find_all("th", class_=COURSE_HEADER_CLASSES):
+        if hdr.parent is None:
+            continue
+        # course header
+        course_line = hdr.get_text(strip=True)
+        course_line = course_line.replace("<strong>", "").replace("</strong>", "")
+
+        # collect all following <tr> rows that belong to this course
+        classes_info = []
+        for sibling in hdr.parent.find_next_siblings("tr"):
+            # stop if we hit the next course header
+            if sibling.find("th", class_=COURSE_HEADER_CLASSES):
+                break
+
+            # collect the text of every <td> in this <tr>
+            cells = [td.get_text(strip=True) for td in sibling.find_all("td")]
+            if not cells:
+                continue
+
+            # build one line per class, e.g.
+            # "Kelas Teori Matriks (A); Indonesia; 25/08/2025 - 19/12/2025; Rabu, 08.00-09.40; D.109; - Dra. ..."
+            class_line = "; ".join(cells[1:])  # skip the first cell (index number)
+            classes_info.append(class_line)
+
+        # merge course header + its classes
+        full_entry = (
+            f"{course_line}: | " + " | ".join(classes_info) if classes_info else course_line
+        )
+        courses.append(full_entry)
+
+    return courses
+
+
+class _Element:
+    __slots__ = ("tag", "parent")
+
+    def __init__(self, tag: str, parent: "_Element | None"):
+        self.tag = tag
+        self.parent = parent
+
+
+class _Text:
+    """Collects the stripped strings of an open <th>/<td>."""
+
+    __slots__ = ("element", "parts")
+
+    def __init__(self, element: _Element):
+        self.element = element
+        self.parts: list[str] = []
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+class _Course:
+    __slots__ = ("header", "cells")
+
+    def __init__(self, header: _Text):
+        self.header = header
+        self.cells: list[list[_Text]] = []
+
+
+class _Row:
+    """An open <tr> that is a following sibling of one or more course header rows."""
+
+    __slots__ = ("element", "scope", "courses", "cells", "has_header")
+
+    def __init__(self, element: _Element, scope: _Element, courses: list[_Course]):
+        self.element = element
+        self.scope = scope
+        self.courses = courses
+        self.cells: list[_Text] = []
+        self.has_header = False
+
+
+class ScheduleParser(HTMLParser):
+    """Event-driven Schedule page extractor.
+
+    A course header `<th>` opens a course in the scope of its row's parent (e.g. `<tbody>`).
+    Every later `<tr>` in that scope belongs to the course, until a row containing another
+    course header closes it. Text is only kept for open `<th>`/`<td>` elements, so no
+    document tree is built.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._root = _Element("", None)
+        self._stack: list[_Element] = [self._root]
+        self._scopes: dict[_Element, list[_Course]] = {}
+        self._rows: list[_Row] = []
+        self._texts: list[_Text] = []
+        self._data: list[str] = []
+        self._raw_text_depth = 0
+        self._closed_void_elements: Counter[str] = Counter()
+        self._courses: list[_Course] = []
+
+    def lines(self) -> list[str]:
+        courses = []
+        for course in self._courses:
+            course_line = course.header.text().replace("<strong>", "").replace("</strong>", "")
+            classes_info = ["; ".join(cell.text() for cell in cells[1:]) for cells in course.cells]
+            full_entry = (
+                f"{course_line}: | " + " | ".join(classes_info) if classes_info else course_line
+            )
+            courses.append(full_entry)
+        return courses
+
+    def courses(self) -> list[Course]:
+        return [
+            Course.from_header(
+                course.header.text().replace("<strong>", "").replace("</strong>", ""),
+                [
+                    ClassSection.from_cells([tuple(cell.parts) for cell in cells[1:]])
+                    for cells in course.cells
+                ],
+            )
+            for course in self._courses
+        ]
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in VOID_ELEMENTS:
+            # A later stray end tag for it (e.g. <br>...</br>) is swallowed without a flush.
+            self._closed_void_elements[tag] += 1
+            return
+
+        parent = self._stack[-1]
+        element = _Element(tag, parent)
+        self._stack.append(element)
+
+        if tag in RAW_TEXT_ELEMENTS:
+            self._raw_text_depth += 1
+        elif tag == "tr":
+            courses = self._scopes.get(parent)
+            if courses:
+                self._rows.append(_Row(element, parent, list(courses)))
+        elif tag == "td":
+            if self._rows:
+                text = _Text(element)
+                self._texts.append(text)
+                for row in self._rows:
+                    row.cells.append(text)
+        elif tag == "th" and self._is_course_header(attrs):
+            for row in self._rows:
+                row.has_header = True
+            header = _Text(element)
+            self._texts.append(header)
+            course = _Course(header)
+            self._courses.append(course)
+            scope = parent.parent
+            if scope is not None:
+                self._scopes.setdefault(scope, []).append(course)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            self._closed_void_elements[tag] -= 1
+        else:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self._closed_void_elements[tag] > 0:
+            self._closed_void_elements[tag] -= 1
+            return
+        self._flush()
+        # Pop up to the most recent matching element. Stray end tags are ignored.
+        for i in range(len(self._stack) - 1, 0, -1):
+            if self._stack[i].tag == tag:
+                break
+        else:
+            return
+        while len(self._stack) > i:
+            self._close(self._stack.pop())
+
+    def handle_data(self, data):
+        if not self._raw_text_depth:
+            self._data.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+
+    def close(self):
+        super().close()
+        self._flush()
+        # Elements left open at the end of the document still count
+        while len(self._stack) > 1:
+            self._close(self._stack.pop())
+
+    def _flush(self):
+        """Hand the pending string to every open <th>/<td>, like get_text(strip=True)."""
+        if not self._data:
+            return
+        string = "".join(self._data).strip()
+        self._data.clear()
+        if string:
+            for text in self._texts:
+                text.parts.append(string)
+
+    def _close(self, element: _Element):
+        if element.tag in RAW_TEXT_ELEMENTS:
+            self._raw_text_depth -= 1
+        if self._texts and self._texts[-1].element is element:
+            self._texts.pop()
+        if self._rows and self._rows[-1].element is element:
+            row = self._rows.pop()
+            if row.has_header:
+                # The next course starts here, so its predecessors in this scope are complete.
+                scoped = self._scopes[row.scope]
+                for course in row.courses:
+                    scoped.remove(course)
+            elif row.cells:
+                for course in row.courses:
+                    course.cells.append(row.cells)
+        self._scopes.pop(element, None)
+
+    @staticmethod
+    def _is_course_header(attrs: list[tuple[str, str | None]]) -> bool:
+        for name, value in attrs:
+            if name == "class" and value:
+                if value in COURSE_HEADER_CLASSES:
+                    return True
+                return any(cls in COURSE_HEADER_CLASSES for cls in value.split())
+        return False
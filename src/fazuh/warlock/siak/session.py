@@ -0,0 +1,59 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fazuh.warlock.siak.browser_health import BrowserHealth
+from fazuh.warlock.siak.browser_health import BrowserStats
+from fazuh.warlock.siak.siak import Siak
+
+
+class SiakSession:
+    """One logged-in `Siak` shared by several modules running in the same process.
+
+    - `authenticate` logs in at most once at a time. Tasks that found the session expired
+      pass the `generation` they saw, and skip logging in if another task already did.
+    - Work wrapped in `priority` (the war bot) holds off `wait_for_priority` callers (tracker
+      polls) until it is done, so they do not compete for the server or the browser.
+    - `check_health` recycles the browser when it grows too large, never during priority work
+      and only once the tabs other modules opened with `Siak.tab` are closed.
+    """
+
+    def __init__(self, siak: Siak):
+        self.siak = siak
+        self.generation = 0  # Bumped on every login
+        self._auth_lock = asyncio.Lock()
+        self._prioritized = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.health = BrowserHealth(siak)
+
+    async def authenticate(self, generation: int | None = None) -> bool:
+        """Make sure the session is logged in, unless it was renewed since `generation`."""
+        async with self._auth_lock:
+            if generation is not None and generation != self.generation:
+                return True
+            if not await self.siak.authenticate():
+                return False
+            self.generation += 1
+            return True
+
+    @asynccontextmanager
+    async def priority(self) -> AsyncIterator[None]:
+        self._prioritized += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._prioritized -= 1
+            if not self._prioritized:
+                self._idle.set()
+
+    async def wait_for_priority(self):
+        """Wait until no prioritized work is running."""
+        await self._idle.wait()
+
+    async def check_health(self, force: bool = False) -> BrowserStats | None:
+        """See `BrowserHealth.check`. Skipped while prioritized work may be using the browser."""
+        if self._prioritized:
+            return None
+        return await self.health.check(force)
@@ -1,14 +1,39 @@
 import asyncio
 import base64
-
+from contextlib import asynccontextmanager
+import json
+import pathlib
+import time
+from typing import AsyncIterator
+from urllib.parse import urlencode
+from urllib.parse import urlparse
+
+import httpx
 from loguru import logger
 from playwright.async_api import async_playwright
 from playwright.async_api import Browser
+from playwright.async_api import Frame
 from playwright.async_api import Page
-import requests
 
 from fazuh.warlock.config import Config
+from fazuh.warlock.metrics import Metrics
+from fazuh.warlock.notifier import Notification
+from fazuh.warlock.notifier import Notifier
+from fazuh.warlock.siak.captcha import CaptchaSolver
+from fazuh.warlock.siak.clock import ServerClock
+from fazuh.warlock.siak.login_form import parse_login_form
+from fazuh.warlock.siak.page_state import classify
+from fazuh.warlock.siak.page_state import INVALID_CAPTCHA_KEYWORD
+from fazuh.warlock.siak.page_state import PageState
 from fazuh.warlock.siak.path import Path
+from fazuh.warlock.siak.resource_blocker import ResourceBlocker
+
+SESSION_COOKIE = "siakng_cc"
+# Sent by the HTTP client until a browser provides its own
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)"
+    " Chrome/129.0.0.0 Safari/537.36"
+)
 
 
 class Siak:
@@ -16,8 +41,37 @@ class Siak:
         self.username = username
         self.password = password
         self.config = Config()
-
-    async def start(self):
+        self.metrics = Metrics()
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self._browser_lock = asyncio.Lock()
+        # For `BrowserHealth`: when the browser was launched and how many pages it loaded since
+        self.launched_at = time.monotonic()
+        self.navigations = 0
+        # Tabs opened with `tab`, which `recycle_browser` waits for, and whether it is done
+        self._tabs = 0
+        self._tabs_closed = asyncio.Event()
+        self._tabs_closed.set()
+        self._recycled = asyncio.Event()
+        self._recycled.set()
+        # Where the logged-in browser state (cookies, local storage) is kept between runs
+        self.session_file = (
+            pathlib.Path(self.config.session_file) if self.config.session_file else None
+        )
+        self.client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=30,
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+            # Replaced by the browser's own once its cookies are exported
+            headers={"User-Agent": USER_AGENT},
+        )
+        self.clock = ServerClock()
+        self._load_session()
+
+    async def start(self, storage_state: dict | None = None):
+        """Launch the browser. `storage_state` overrides the session file, e.g. when recycling."""
         self.playwright = await async_playwright().start()
 
         match self.config.browser:
@@ -31,21 +85,174 @@ class Siak:
                 logger.error(f"Unsupported browser: {self.config.browser}. Defaulting to Chromium.")
                 browser = self.playwright.chromium
 
-        self.browser = await browser.launch(headless=self.config.headless)
-        self.page = await self.browser.new_page()
+        with self.metrics.span("browser_launch"):
+            self.browser = await browser.launch(headless=self.config.headless)
+        self.launched_at = time.monotonic()
+        self.navigations = 0
+        self.context = await self.browser.new_context(
+            storage_state=storage_state or self._stored_session()
+        )
+        self.blocker = None
+        if self.config.block_resources:
+            self.blocker = ResourceBlocker(
+                blocked_types=set(self.config.blocked_resource_types),
+                allowed_hosts={urlparse(Path.HOSTNAME).hostname, *self.config.allowed_hosts},
+            )
+            await self.blocker.attach(self.context)
+        await self.import_cookies()  # Share a session the HTTP client already has
+        self.page = await self.new_page()
+
+    async def new_page(self) -> Page:
+        """Open a tab in the session's context, with its loads reported by the resource blocker."""
+        page = await self.context.new_page()
+        if self.blocker is not None:
+            self.blocker.watch(page)
+        page.on("framenavigated", self._count_navigation)
+        return page
+
+    @asynccontextmanager
+    async def tab(self) -> AsyncIterator[Page]:
+        """A new tab (see `new_page`), closed on exit. The browser is not recycled meanwhile."""
+        await self._recycled.wait()
+        self._tabs += 1
+        self._tabs_closed.clear()
+        try:
+            page = await self.new_page()
+            try:
+                yield page
+            finally:
+                await page.close()
+        finally:
+            self._tabs -= 1
+            if not self._tabs:
+                self._tabs_closed.set()
+
+    def _count_navigation(self, frame: Frame):
+        if frame.parent_frame is None:
+            self.navigations += 1
+
+    def is_connected(self) -> bool:
+        """Check if the browser is running and usable."""
+        return self.browser is not None and self.browser.is_connected()
+
+    async def ensure_browser(self):
+        """Launch the browser if it is not running, e.g. to solve a CAPTCHA."""
+        async with self._browser_lock:  # Modules sharing this session may ask at the same time
+            if not self.is_connected():
+                await self.close_browser()
+                await self.start()
+
+    async def recycle_browser(self):
+        """Relaunch the browser to free its memory, keeping the session (cookies, local storage)."""
+        async with self._browser_lock:
+            self._recycled.clear()  # New tabs wait for the new browser
+            try:
+                await self._tabs_closed.wait()  # Let open tabs finish, e.g. tracker checks
+                state = None
+                if self.is_connected():
+                    await self.export_cookies()
+                    state = await self.context.storage_state()
+                await self.close_browser()
+                await self.start(storage_state=state)
+            finally:
+                self._recycled.set()
 
     async def authenticate(self) -> bool:
+        """Log in, posting the login form over HTTP. The browser is only used for a CAPTCHA.
+
+        On success, the session cookies are in the HTTP client and, if it runs, the browser.
+        """
         try:
-            if await self.is_logged_in():
-                return True  # Already logged in, no need to authenticate
+            with self.metrics.span("session_check"):
+                if await self.is_session_valid():
+                    return True  # Already logged in (or restored), no need to authenticate
+
+            self.metrics.inc("auth_attempts")
+            state = await self._login_http()
+            if state is None:
+                logger.info("Logging in with the browser instead...")
+                await self.ensure_browser()
+                state = await self._login_browser()
+                await self.export_cookies()
+            elif self.is_connected():
+                await self.import_cookies()
+        except Exception as e:
+            self.metrics.inc("auth_failures")
+            logger.error(f"An unexpected error occurred during authentication: {e}")
+            return False
+
+        if state is not PageState.OK:
+            self.metrics.inc("auth_failures")
+            match state:
+                case PageState.REJECTED:
+                    logger.error("Authentication failed. The requested URL was rejected.")
+                case PageState.HIGH_LOAD:
+                    logger.error("Server is under high load.")
+                case PageState.INACCESSIBLE:
+                    logger.error("The page is currently inaccessible.")
+                case _:
+                    logger.error(
+                        "Initial authentication failed. "
+                        "Please check your credentials or CAPTCHA solution."
+                    )
+            return False
+
+        logger.info("Authentication successful.")
+        await self.save_session()
+        return True
 
+    async def _login_http(self) -> PageState | None:
+        """Post the login form with the HTTP client and follow it to Welcome.
+
+        Returns the state of the resulting page, OK only if the session cookie was set. Returns
+        None if the browser is needed: the server asked for a CAPTCHA, or the form is unknown.
+        """
+        with self.metrics.span("login_page"):
+            resp = await self.fetch(Path.AUTHENTICATION)
+        state = classify(resp.text, str(resp.url), resp.status_code)
+        if state is PageState.CAPTCHA:
+            logger.info("CAPTCHA required.")
+            return None
+        if state is not PageState.LOGIN:
+            return state
+        form = parse_login_form(resp.text, str(resp.url))
+        if form is None:
+            logger.warning("Unrecognized login form.")
+            return None
+
+        with self.metrics.span("login_submit"):
+            # Redirects through ChangeRole to Welcome, collecting the session cookie
+            sent_at = time.time()
+            resp = await self.client.post(
+                form.action,
+                content=urlencode(form.payload(self.username, self.password)),
+                headers={
+                    "Content-Type": "application/x-www-form-urlencoded",
+                    "Origin": Path.HOSTNAME.rstrip("/"),
+                    "Referer": str(resp.url),
+                },
+            )
+            self.clock.observe(resp.headers.get("Date"), sent_at, time.time())
+        state = classify(resp.text, str(resp.url), resp.status_code)
+        if state is PageState.CAPTCHA:
+            logger.info("CAPTCHA required.")
+            return None
+        if state is PageState.OK and not self._has_session_cookie():
+            return PageState.LOGIN
+        return state
+
+    async def _login_browser(self) -> PageState:
+        """Log in with the browser, solving CAPTCHAs. Returns the state of the resulting page."""
+        with self.metrics.span("login_page"):
             await self.page.goto(Path.AUTHENTICATION, wait_until="domcontentloaded")
-            # self.page.wait_for_load_state("networkidle")
+        # self.page.wait_for_load_state("networkidle")
 
-            # Handle pre-login CAPTCHA page
-            if await self.handle_captcha():
-                return await self.authenticate()
+        # Handle pre-login CAPTCHA page
+        if await self.handle_captcha():
+            self.metrics.inc("auth_retries")
+            return await self._login_browser()
 
+        with self.metrics.span("login_submit"):
             await self.page.wait_for_selector("input[name=u]", state="visible")
             # Proceed with standard login
             await self.page.fill("input[name=u]", self.username)
@@ -53,40 +260,66 @@ class Siak:
             await self.page.click("input[type=submit]")
             await self.page.wait_for_load_state("networkidle")
 
-            # Handle post-login CAPTCHA page (possible)
-            if await self.handle_captcha():
-                return await self.authenticate()
+        # Handle post-login CAPTCHA page (possible)
+        state = await self.classify()
+        if await self.handle_captcha(state):
+            self.metrics.inc("auth_retries")
+            if await self.is_cookie_exists() and await self.is_logged_in():
+                return PageState.OK
+            return await self._login_browser()
 
-        except Exception as e:
-            logger.error(f"An unexpected error occurred during authentication: {e}")
-            return False
+        if state is PageState.OK and not await self.is_cookie_exists():
+            return PageState.LOGIN
+        return state
 
-        if await self.is_rejected_page():
-            logger.error("Authentication failed. The requested URL was rejected.")
-            return False
+    async def save_session(self):
+        """Persist the session so later runs can skip logging in.
 
-        if not await self.is_cookie_exists():
-            logger.error(
-                "Initial authentication failed. Please check your credentials or CAPTCHA solution."
-            )
-            return False
-        # else:
-        #     logger.success(f"Successful login. Obtained cookie: {await self.get_cookie()}")
-
-        if await self.is_high_load_page():
-            logger.error("Server is under high load.")
-            return False
-
-        if await self.is_inaccessible_page():
-            logger.error("The page is currently inaccessible.")
-            return False
+        Saved as a browser storage state. Without a browser, only the cookies are saved.
+        """
+        if self.session_file is None:
+            return
+        self.session_file.parent.mkdir(parents=True, exist_ok=True)
+        if self.is_connected():
+            await self.context.storage_state(path=self.session_file)
+        else:
+            state = {"cookies": self._client_cookies(), "origins": []}
+            self.session_file.write_text(json.dumps(state, indent=2))
+
+    async def reset_session(self):
+        """Drop the current session in place, without relaunching the browser.
+
+        The next `authenticate` then performs a fresh login.
+        """
+        if self.is_connected():
+            await self.context.clear_cookies()
+        self.client.cookies.clear()
+        if self.session_file is not None:
+            self.session_file.unlink(missing_ok=True)
+
+    def _stored_session(self) -> str | None:
+        if self.session_file is not None and self.session_file.exists():
+            return str(self.session_file)
+        return None
+
+    def _load_session(self):
+        """Restore the cookies of a saved session into the HTTP client."""
+        stored = self._stored_session()
+        if stored is None:
+            return
+        try:
+            cookies = json.loads(pathlib.Path(stored).read_text())["cookies"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not restore the session from {stored}: {e}")
+            return
+        self._set_client_cookies(cookies)
 
-        logger.info("Authentication successful.")
-        return True
+    async def handle_captcha(self, state: PageState | None = None) -> bool:
+        """Extracts CAPTCHA, notifies admin, and submits the solution from `CaptchaSolver`.
 
-    async def handle_captcha(self) -> bool:
-        """Extracts CAPTCHA, notifies admin, and gets solution from CLI."""
-        if not await self.is_captcha_page():
+        `state` is the already classified current page, if known.
+        """
+        if (state or await self.classify()) is not PageState.CAPTCHA:
             return False
 
         try:
@@ -101,17 +334,20 @@ class Siak:
             base64_data = image_src.split(",", 1)[1]
             image_data = base64.b64decode(base64_data)
 
-            if self.config.auth_discord_webhook_url:
-                await self._notify_admin_for_captcha(image_data)
+            solver = CaptchaSolver()
+            if self.config.auth_discord_webhook_url and not solver.is_cached(image_data):
+                self._notify_admin_for_captcha(image_data, solver.hint(image_data))
 
-            captcha_solution = await asyncio.to_thread(
-                input, "Please enter the CAPTCHA code from the image: "
-            )
+            with self.metrics.span("captcha_wait"):
+                captcha_solution = await solver.solve(image_data)
 
             await self.page.fill("input[name=answer]", captcha_solution)
             await self.page.click("button#jar")
 
             await self.page.wait_for_load_state("networkidle")
+            if INVALID_CAPTCHA_KEYWORD in await self.page.content():
+                logger.warning("The CAPTCHA answer was rejected.")
+                solver.invalidate(image_data)
 
         except Exception as e:
             logger.error(f"Failed to handle CAPTCHA: {e}")
@@ -119,81 +355,118 @@ class Siak:
 
         return True
 
-    async def _notify_admin_for_captcha(self, image_data: bytes):
-        """Sends the CAPTCHA image to the admin webhook."""
+    def _notify_admin_for_captcha(self, image_data: bytes, hint: str):
+        """Sends the CAPTCHA image to the admin webhook, with where to answer (`hint`)."""
         if not self.config.auth_discord_webhook_url:
             return
 
-        message = "CAPTCHA detected. Please provide the solution."
+        message = f"CAPTCHA detected. Please provide the solution {hint}."
         if self.config.user_id:
             message = f"<@{self.config.user_id}> {message}"
 
-        try:
-            files = {"file": ("captcha.png", image_data, "image/png")}
-            data = {"username": "Warlock Auth", "content": message}
-            response = await asyncio.to_thread(
-                requests.post,
-                self.config.auth_discord_webhook_url,
-                data=data,
-                files=files,
-                timeout=10,
+        Notifier().notify(
+            Notification(
+                webhook_url=self.config.auth_discord_webhook_url,
+                username="Warlock Auth",
+                content=message,
+                file=("captcha.png", image_data, "image/png"),
             )
-            response.raise_for_status()
-            logger.info("Admin notified about CAPTCHA and image sent.")
-        except requests.RequestException as e:
-            logger.error(f"Failed to notify admin via webhook: {e}")
+        )
 
     async def is_cookie_exists(self) -> bool:
         """Check if the user is logged in by looking for the session cookie."""
         cookies = await self.page.context.cookies()
-        return "siakng_cc" in [cookie["name"] for cookie in cookies]
+        return SESSION_COOKIE in [cookie["name"] for cookie in cookies]
 
     async def get_cookie(self) -> str:
         cookies = await self.page.context.cookies()
         for cookie in cookies:
-            if cookie["name"] == "siakng_cc":
+            if cookie["name"] == SESSION_COOKIE:
                 return cookie["value"]
         return ""
 
-    async def is_logged_in(self) -> bool:
-        """Check if the user is logged in by visiting a known page."""
-        await self.page.goto(Path.WELCOME, wait_until="domcontentloaded")
-        # If we are on the CAPTCHA or Login page, we are not logged in.
-        if await self.is_captcha_page():
-            return False
-        if self.page.url == Path.AUTHENTICATION:
-            return False
-        return True
+    async def export_cookies(self):
+        """Copy the browser context cookies (including siakng_cc) into the HTTP client.
+
+        Does nothing without a browser, as the HTTP client then holds the session already.
+        """
+        if not self.is_connected():
+            return
+        self._set_client_cookies(await self.context.cookies())
+        user_agent = await self.page.evaluate("navigator.userAgent")
+        self.client.headers["User-Agent"] = user_agent
+
+    async def import_cookies(self):
+        """Copy the HTTP client cookies into the browser context, e.g. after an HTTP login."""
+        cookies = self._client_cookies()
+        if cookies:
+            await self.context.add_cookies(cookies)
+
+    def _set_client_cookies(self, cookies: list[dict]):
+        self.client.cookies.clear()
+        for cookie in cookies:
+            self.client.cookies.set(
+                cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"]
+            )
 
-    async def is_captcha_page(self) -> bool:
-        """Check if the current page is a CAPTCHA page."""
-        content = await self.page.content()
-        keywords = [
-            "This question is for testing whether you are a human visitor",
-            "What code is in the image?",
-            "You have entered an invalid answer",
+    def _client_cookies(self) -> list[dict]:
+        """The HTTP client cookies, in the format of Playwright's storage state."""
+        return [
+            {
+                "name": cookie.name,
+                "value": cookie.value or "",
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "expires": cookie.expires if cookie.expires is not None else -1,
+                "httpOnly": cookie.has_nonstandard_attr("HttpOnly"),
+                "secure": cookie.secure,
+                "sameSite": "Lax",
+            }
+            for cookie in self.client.cookies.jar
         ]
-        return any(keyword in content for keyword in keywords)
 
-    async def is_rejected_page(self) -> bool:
-        """Check if the current page is a rejected URL page."""
-        content = await self.page.content()
-        return "The requested URL was rejected" in content
+    def _has_session_cookie(self) -> bool:
+        return any(cookie.name == SESSION_COOKIE for cookie in self.client.cookies.jar)
+
+    async def fetch(self, url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+        """GET a page over the pooled HTTP client using the exported session cookies.
+
+        Every response also refines the estimate of the server clock.
+        """
+        sent_at = time.time()
+        resp = await self.client.get(url, headers=headers)
+        self.clock.observe(resp.headers.get("Date"), sent_at, time.time())
+        return resp
+
+    async def is_session_valid(self) -> bool:
+        """Check if the session is logged in with a plain request, without rendering a page."""
+        if not self._has_session_cookie():
+            if not self.is_connected() or not await self.is_cookie_exists():
+                return False
+            await self.export_cookies()
+        resp = await self.fetch(Path.WELCOME)
+        state = classify(resp.text, str(resp.url), resp.status_code)
+        return state not in (PageState.LOGIN, PageState.CAPTCHA)
 
-    async def is_high_load_page(self) -> bool:
-        """Check if the current page indicates high server load."""
-        # Maaf, server SIAKNG sedang mengalami load tinggi dan belum dapat melayani request Anda saat ini.
-        # Silahkan mencoba beberapa saat lagi.
-        content = await self.page.content()
-        return "Silahkan mencoba beberapa saat lagi." in content
+    async def is_logged_in(self) -> bool:
+        """Check if the user is logged in by visiting a known page."""
+        await self.page.goto(Path.WELCOME, wait_until="domcontentloaded")
+        # If we are on the CAPTCHA or Login page, we are not logged in.
+        return await self.classify() not in (PageState.LOGIN, PageState.CAPTCHA)
 
-    async def is_inaccessible_page(self) -> bool:
-        """Check if the current page is inaccessible."""
-        content = await self.page.content()
-        return "Silakan mencoba beberapa saat lagi." in content
+    async def classify(self) -> PageState:
+        """Classify the current page from a single content snapshot."""
+        return classify(await self.page.content(), self.page.url)
 
-    async def close(self):
-        if hasattr(self, "browser"):
+    async def close_browser(self):
+        """Shut down the browser but keep the HTTP client and its cookies."""
+        if self.browser is not None:
             await self.browser.close()
-        if hasattr(self, "playwright"):
+            self.browser = None
+        if self.playwright is not None:
             await self.playwright.stop()
+            self.playwright = None
+
+    async def close(self):
+        await self.close_browser()
+        await self.client.aclose()
@@ -0,0 +1,38 @@
+"""Serve the SIAK stand-in until interrupted.
+
+Run with `python -m fazuh.warlock.standin`, then set SIAK_HOSTNAME to the printed URL.
+"""
+
+import argparse
+
+from fazuh.warlock.standin.server import StandInServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the SIAK portal")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--username", default="user")
+    parser.add_argument("--password", default="pass")
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--classes", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to responses")
+    parser.add_argument("--captcha", action="store_true", help="Ask for a CAPTCHA on login")
+    parser.add_argument("--closed", action="store_true", help="Registration period not started")
+    args = parser.parse_args()
+
+    server = StandInServer(args.port, args.username, args.password, args.courses, args.classes)
+    server.latency = args.latency
+    server.captcha = args.captcha
+    server.registration_open = not args.closed
+    print(f"Serving SIAK stand-in on {server.url} (CAPTCHA answer: {server.captcha_answer})")
+    print(f"Webhook URL: {server.webhook_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
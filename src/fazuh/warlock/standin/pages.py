@@ -0,0 +1,165 @@
+"""HTML of the SIAK pages served by the stand-in server.
+
+Only the parts warlock relies on are reproduced: form fields, table shapes and the
+keywords that `fazuh.warlock.siak.page_state.classify` looks for.
+"""
+
+import base64
+import html
+import struct
+import zlib
+
+from fazuh.warlock.siak.page_state import CAPTCHA_KEYWORDS
+from fazuh.warlock.siak.page_state import HIGH_LOAD_KEYWORD
+from fazuh.warlock.siak.page_state import INACCESSIBLE_KEYWORD
+from fazuh.warlock.siak.page_state import REGISTRATION_CLOSED_KEYWORD
+from fazuh.warlock.siak.page_state import REJECTED_KEYWORD
+
+DAYS = ("Senin", "Selasa", "Rabu", "Kamis", "Jumat")
+
+# Enough of the real pages' <head> to make a browser fetch the usual assets
+HEAD = (
+    '<link rel="stylesheet" href="/static/style.css">'
+    '<link rel="icon" href="/favicon.ico">'
+    '<script>var csrf = "token";</script>'
+)
+
+
+def page(title: str, body: str) -> str:
+    return (
+        f"<!DOCTYPE html><html><head><title>{title}</title>{HEAD}</head>"
+        f'<body><img src="/static/logo.png" alt="SIAK NG"><div id="ti_m">{body}</div></body></html>'
+    )
+
+
+def login_page(error: str = "") -> str:
+    error = f'<p class="error">{html.escape(error)}</p>' if error else ""
+    return page(
+        "Login",
+        f"{error}"
+        '<form method="post" action="/main/Authentication/Index">'
+        '<input type="text" name="u"><input type="password" name="p">'
+        '<input type="submit" value="Login"></form>',
+    )
+
+
+def captcha_page(image: bytes) -> str:
+    src = "data:image/png;base64," + base64.b64encode(image).decode("ascii")
+    return page(
+        "Captcha",
+        f"<p>{CAPTCHA_KEYWORDS[0]}</p><p>{CAPTCHA_KEYWORDS[1]}</p>"
+        '<form method="post" action="/main/Authentication/Captcha">'
+        f'<img src="{src}"><input type="text" name="answer">'
+        '<button id="jar" type="submit">Submit</button></form>',
+    )
+
+
+def high_load_page() -> str:
+    return page(
+        "SIAK NG",
+        "<p>Maaf, server SIAKNG sedang mengalami load tinggi dan belum dapat melayani request"
+        f" Anda saat ini. {HIGH_LOAD_KEYWORD}</p>",
+    )
+
+
+def inaccessible_page() -> str:
+    return page("SIAK NG", f"<p>Halaman tidak dapat diakses. {INACCESSIBLE_KEYWORD}</p>")
+
+
+def rejected_page() -> str:
+    return (
+        "<html><head><title>Request Rejected</title></head>"
+        f"<body>{REJECTED_KEYWORD}. Please consult with your administrator.</body></html>"
+    )
+
+
+def welcome_page(username: str) -> str:
+    return page("Welcome", f"<h2>Selamat datang, {html.escape(username)}</h2>")
+
+
+def schedule_page(courses: int, classes: int, revision: int = 0) -> str:
+    """Build a Schedule page shaped like the whole-university listing.
+
+    Pages of different `revision`s differ in the room of one class per course.
+    """
+    rows = []
+    for c in range(courses):
+        rows.append(
+            '<tr><th colspan="7" class="sub border2 pad2">'
+            f"<strong>CSGE{600000 + c} - Mata Kuliah {c} (4 SKS, Term 1)</strong>;"
+            " Kurikulum 01.00.12.01-2020</th></tr>"
+        )
+        for k in range(classes):
+            day = DAYS[(c + k) % len(DAYS)]
+            room = 100 + k + (revision if k == 0 else 0)
+            rows.append(
+                f'<tr class="{"alt" if k % 2 else "x"}">'
+                f'<td class="ce">{k + 1}</td>'
+                f'<td><a href="ClassInfo?cc={c}{k}">'
+                f"Kelas Mata Kuliah {c} ({chr(65 + k % 26)})</a></td>"
+                "<td>Indonesia</td>"
+                "<td>25/08/2025 - 19/12/2025</td>"
+                f"<td>{day}, 08.00-09.40<br>{DAYS[(c + k + 2) % len(DAYS)]}, 10.00-11.40</td>"
+                f"<td>D.{room}<br>D.{200 + k}</td>"
+                f"<td>- Dosen {c}-{k}<br>- Asisten {c}-{k}</td>"
+                "</tr>"
+            )
+    return page("Jadwal Kuliah", '<table class="box"><tbody>' + "".join(rows) + "</tbody></table>")
+
+
+def course_plan_page(courses: int, classes: int) -> str:
+    """Build the CoursePlanEdit IRS form, one radio group per course.
+
+    Row labels and lecturers follow `schedule_page`, e.g. "Mata Kuliah 3 (B)" taught by
+    "Dosen 3-1".
+    """
+    rows = []
+    for c in range(courses):
+        rows.append(f'<tr><th colspan="9">CSGE{600000 + c} - Mata Kuliah {c}</th></tr>')
+        for k in range(classes):
+            rows.append(
+                f'<tr class="{"alt" if k % 2 else "x"}">'
+                f'<td><input type="radio" name="c[CSGE{600000 + c}_01.00.12.01-2020]"'
+                f' value="{700000 + c * classes + k}-4" id="c{c}_{k}"></td>'
+                f'<td><label for="c{c}_{k}">Mata Kuliah {c} ({chr(65 + k % 26)})</label></td>'
+                "<td>4</td><td>Indonesia</td><td>Reguler</td>"
+                f"<td>{DAYS[(c + k) % len(DAYS)]}, 08.00-09.40</td>"
+                f"<td>D.{100 + k}</td><td>{40 + k}</td>"
+                f"<td>- Dosen {c}-{k}<br>- Asisten {c}-{k}</td>"
+                "</tr>"
+            )
+    return page(
+        "Isi IRS",
+        '<form method="post" action="/main/CoursePlan/CoursePlanSave">'
+        '<input type="hidden" name="tokens" value="1234567890">'
+        '<table class="box"><tbody>' + "".join(rows) + "</tbody></table>"
+        '<input type="submit" name="submit" value="Simpan IRS"></form>',
+    )
+
+
+def registration_closed_page() -> str:
+    return page("Isi IRS", f"<p>{REGISTRATION_CLOSED_KEYWORD}.</p>")
+
+
+def course_plan_saved_page(selected: int) -> str:
+    return page("Ringkasan IRS", f"<p>IRS berhasil disimpan. {selected} kelas dipilih.</p>")
+
+
+def png(width: int = 120, height: int = 40) -> bytes:
+    """A plain white PNG, good enough as a CAPTCHA image."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+        )
+
+    raw = b"".join(b"\x00" + b"\xff" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
@@ -0,0 +1,204 @@
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+import secrets
+import threading
+import time
+from urllib.parse import parse_qsl
+from urllib.parse import urlsplit
+
+from fazuh.warlock.standin import pages
+
+SESSION_COOKIE = "siakng_cc"
+
+
+class StandInServer(ThreadingHTTPServer):
+    """A local server that mimics the SIAK pages warlock uses.
+
+    Runs in a background thread. Point warlock at it with
+    `Path.set_hostname(server.url)`. The attributes below can be changed while it runs to
+    script a scenario, e.g. set `state = "high_load"` to simulate an overloaded server.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        username: str = "user",
+        password: str = "pass",
+        courses: int = 2000,
+        classes: int = 4,
+    ):
+        super().__init__(("127.0.0.1", port), StandInHandler)
+        self.username = username
+        self.password = password
+        # "ok", "high_load", "inaccessible", "rejected" or "unavailable" (HTTP 503), applied to
+        # every SIAK page
+        self.state = "ok"
+        # Whether the next visit to the login page is challenged with a CAPTCHA
+        self.captcha = False
+        self.captcha_answer = "42"
+        self.registration_open = True
+        # Whether saving the IRS redirects to a summary page (Post/Redirect/Get)
+        self.save_redirects = False
+        # Seconds added to every response, to simulate a slow server
+        self.latency = 0.0
+
+        self.schedule = pages.schedule_page(courses, classes)
+        self.course_plan = pages.course_plan_page(min(courses, 50), classes)
+        self.captcha_image = pages.png()
+
+        self.sessions: set[str] = set()
+        self.requests = 0
+        # Form data of every saved IRS, and the body of every webhook call
+        self.submissions: list[list[tuple[str, str]]] = []
+        self.webhooks: list[bytes] = []
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def webhook_url(self) -> str:
+        return f"{self.url}api/webhooks/1/standin"
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def expire_sessions(self):
+        """Log every client out, as when the server restarts."""
+        self.sessions.clear()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server: StandInServer
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real server
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self.server.requests += 1
+        time.sleep(self.server.latency)
+        path = urlsplit(self.path).path
+
+        if path.startswith("/api/webhooks/"):
+            return self._send(200, '{"type": 1}', "application/json")
+        if path.startswith("/static/") or path == "/favicon.ico":
+            return self._send(200, "/* asset */" * 1024, "text/css")
+        if self._overloaded():
+            return
+
+        if path == "/main/Authentication/":
+            if self.server.captcha:
+                return self._send(200, pages.captcha_page(self.server.captcha_image))
+            return self._send(200, pages.login_page())
+        if not self._is_logged_in():
+            return self._redirect("/main/Authentication/")
+
+        if path == "/main/Authentication/ChangeRole/":
+            return self._redirect("/main/Welcome/")
+        if path == "/main/Welcome/":
+            return self._send(200, pages.welcome_page(self.server.username))
+        if path.startswith("/main/Schedule/"):
+            return self._send(200, self.server.schedule)
+        if path == "/main/CoursePlan/CoursePlanEdit":
+            if not self.server.registration_open:
+                return self._send(200, pages.registration_closed_page())
+            return self._send(200, self.server.course_plan)
+        if path == "/main/CoursePlan/CoursePlanSummary" and self.server.submissions:
+            selected = sum(1 for name, _ in self.server.submissions[-1] if name.startswith("c["))
+            return self._send(200, pages.course_plan_saved_page(selected))
+        self._send(404, pages.page("Not Found", "<p>Not Found</p>"))
+
+    def do_POST(self):
+        self.server.requests += 1
+        time.sleep(self.server.latency)
+        path = urlsplit(self.path).path
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+
+        if path.startswith("/api/webhooks/"):
+            self.server.webhooks.append(body)
+            return self._send(204, "")
+        if self._overloaded():
+            return
+
+        form = parse_qsl(body.decode("utf-8"), keep_blank_values=True)
+        fields = dict(form)
+        if path == "/main/Authentication/Captcha":
+            if fields.get("answer") == self.server.captcha_answer:
+                self.server.captcha = False
+            return self._redirect("/main/Authentication/")
+        if path == "/main/Authentication/Index":
+            if (fields.get("u"), fields.get("p")) != (self.server.username, self.server.password):
+                return self._send(200, pages.login_page("Login gagal."))
+            session = secrets.token_hex(16)
+            self.server.sessions.add(session)
+            return self._redirect(
+                "/main/Authentication/ChangeRole/",
+                cookie=f"{SESSION_COOKIE}={session}; Path=/; HttpOnly",
+            )
+
+        if not self._is_logged_in():
+            return self._redirect("/main/Authentication/")
+        if path == "/main/CoursePlan/CoursePlanSave":
+            self.server.submissions.append(form)
+            if self.server.save_redirects:
+                return self._redirect("/main/CoursePlan/CoursePlanSummary")
+            selected = sum(1 for name, _ in form if name.startswith("c["))
+            return self._send(200, pages.course_plan_saved_page(selected))
+        self._send(404, pages.page("Not Found", "<p>Not Found</p>"))
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _overloaded(self) -> bool:
+        match self.server.state:
+            case "high_load":
+                self._send(200, pages.high_load_page())
+            case "inaccessible":
+                self._send(200, pages.inaccessible_page())
+            case "rejected":
+                self._send(200, pages.rejected_page())
+            case "unavailable":
+                self._send(503, pages.page("Service Unavailable", "<p>Service Unavailable</p>"))
+            case _:
+                return False
+        return True
+
+    def _is_logged_in(self) -> bool:
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return SESSION_COOKIE in cookie and cookie[SESSION_COOKIE].value in self.server.sessions
+
+    def _redirect(self, location: str, cookie: str | None = None):
+        self.send_response(302)
+        self.send_header("Location", location)
+        if cookie:
+            self.send_header("Set-Cookie", cookie)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send(self, status: int, content: str, content_type: str = "text/html; charset=utf-8"):
+        body = content.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
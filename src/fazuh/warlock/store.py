@@ -0,0 +1,602 @@
+from bisect import bisect_left
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+import hashlib
+import math
+from pathlib import Path
+import re
+import sqlite3
+import time
+from typing import Iterator
+
+from fazuh.warlock.siak.schedule import ClassSection
+from fazuh.warlock.siak.schedule import Course
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS polls (
+    id INTEGER PRIMARY KEY,
+    polled_at REAL NOT NULL,
+    changes INTEGER NOT NULL
+);
+
+-- Deduplicated contents, addressed by hash
+CREATE TABLE IF NOT EXISTS course_content (
+    hash TEXT PRIMARY KEY,
+    code TEXT NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS class_content (
+    hash TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    language TEXT NOT NULL,
+    period TEXT NOT NULL,
+    schedule TEXT NOT NULL,
+    room TEXT NOT NULL,
+    lecturers TEXT NOT NULL
+);
+
+-- One row per version. ended_at is NULL while the version is current, in which case it was
+-- last seen at the latest poll.
+CREATE TABLE IF NOT EXISTS course_history (
+    id INTEGER PRIMARY KEY,
+    course_key TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES course_content (hash),
+    first_seen REAL NOT NULL,
+    last_seen REAL,
+    ended_at REAL
+);
+CREATE TABLE IF NOT EXISTS class_history (
+    id INTEGER PRIMARY KEY,
+    course_key TEXT NOT NULL,
+    class_key TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES class_content (hash),
+    first_seen REAL NOT NULL,
+    last_seen REAL,
+    ended_at REAL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS course_history_current
+    ON course_history (course_key) WHERE ended_at IS NULL;
+CREATE INDEX IF NOT EXISTS course_history_key ON course_history (course_key, first_seen);
+CREATE UNIQUE INDEX IF NOT EXISTS class_history_current
+    ON class_history (course_key, class_key) WHERE ended_at IS NULL;
+CREATE INDEX IF NOT EXISTS class_history_key
+    ON class_history (course_key, class_key, first_seen);
+
+-- Lookup indexes over the current classes, updated together with class_history. One row per
+-- meeting ("Rabu, 08.00-09.40" in room "D.109") and per lecturer of a class.
+CREATE TABLE IF NOT EXISTS class_meeting (
+    course_key TEXT NOT NULL,
+    class_key TEXT NOT NULL,
+    day TEXT NOT NULL COLLATE NOCASE,
+    starts TEXT NOT NULL,
+    ends TEXT NOT NULL,
+    room TEXT NOT NULL COLLATE NOCASE
+);
+CREATE TABLE IF NOT EXISTS class_lecturer (
+    course_key TEXT NOT NULL,
+    class_key TEXT NOT NULL,
+    lecturer TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS class_meeting_class ON class_meeting (course_key, class_key);
+CREATE INDEX IF NOT EXISTS class_meeting_room ON class_meeting (room, day, starts);
+CREATE INDEX IF NOT EXISTS class_meeting_slot ON class_meeting (day, starts);
+CREATE INDEX IF NOT EXISTS class_lecturer_class ON class_lecturer (course_key, class_key);
+CREATE INDEX IF NOT EXISTS class_lecturer_name ON class_lecturer (lecturer);
+CREATE INDEX IF NOT EXISTS course_content_code ON course_content (code);
+"""
+# Bumped when the lookup indexes change shape, to rebuild them from the current snapshot
+INDEX_VERSION = "1"
+# Bumped when `index_courses` keys courses differently, to re-key the stored history
+KEY_VERSION = "2"
+
+# Separates lines of multi-line cells in class_content
+LINE_SEP = "\n"
+# e.g. "Rabu, 08.00-09.40"
+MEETING_RE = re.compile(r"^\s*([^\W\d]+),\s*(\d{1,2})[.:](\d{2})\s*-\s*(\d{1,2})[.:](\d{2})")
+
+# Current classes with their course, as selected by `find_classes`
+CURRENT_CLASSES = """
+SELECT h.course_key, cc.code, cc.title, c.name, c.language, c.period, c.schedule, c.room,
+    c.lecturers
+FROM class_history h
+JOIN class_content c ON c.hash = h.hash
+JOIN course_history ch ON ch.course_key = h.course_key AND ch.ended_at IS NULL
+JOIN course_content cc ON cc.hash = ch.hash
+WHERE h.ended_at IS NULL
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class ClassVersion:
+    """A stored version of a class and when it was observed."""
+
+    section: ClassSection
+    first_seen: float
+    last_seen: float
+    ended_at: float | None
+
+
+class ScheduleStore:
+    """SQLite history of tracked Schedule snapshots.
+
+    Every poll is recorded, but only added, changed and removed courses/classes are written.
+    Unchanged rows stay current and share the timestamp of the latest poll as "last seen".
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        if self.get_meta("key_version") != KEY_VERSION:
+            self._rekey()  # Also rebuilds the lookup indexes
+        elif self.get_meta("index_version") != INDEX_VERSION:
+            self._rebuild_index()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM polls LIMIT 1").fetchone() is None
+
+    def last_polled_at(self) -> float | None:
+        row = self.conn.execute("SELECT MAX(polled_at) FROM polls").fetchone()
+        return row[0]
+
+    def get_meta(self, key: str) -> str | None:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, **values: str | None):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items()
+            )
+
+    def latest(self) -> dict[str, Course]:
+        """The current snapshot, keyed like `index_courses`."""
+        courses: dict[str, Course] = {}
+        for key, code, title in self.conn.execute(
+            "SELECT h.course_key, c.code, c.title FROM course_history h"
+            " JOIN course_content c ON c.hash = h.hash"
+            " WHERE h.ended_at IS NULL ORDER BY h.course_key"
+        ):
+            courses[key] = Course(code=code, title=title)
+
+        for course_key, class_key, *fields in self.conn.execute(
+            "SELECT h.course_key, h.class_key, c.name, c.language, c.period, c.schedule, c.room,"
+            " c.lecturers FROM class_history h JOIN class_content c ON c.hash = h.hash"
+            " WHERE h.ended_at IS NULL ORDER BY h.course_key, h.id"
+        ):
+            courses[course_key].classes[class_key] = _section(fields)
+        return courses
+
+    def touch(self, polled_at: float | None = None):
+        """Record a poll that found no changes."""
+        with self.conn:
+            self._add_poll(polled_at or time.time(), 0)
+
+    def record(self, courses: dict[str, Course], polled_at: float | None = None) -> int:
+        """Record a poll of `courses`, writing only what differs from the current snapshot.
+
+        Returns the number of changed courses and classes.
+        """
+        now = polled_at or time.time()
+        with self.conn:
+            last_seen = self.last_polled_at()
+            current_courses = dict(
+                self.conn.execute(
+                    "SELECT course_key, hash FROM course_history WHERE ended_at IS NULL"
+                ).fetchall()
+            )
+            current_classes = {
+                (course_key, class_key): hash_
+                for course_key, class_key, hash_ in self.conn.execute(
+                    "SELECT course_key, class_key, hash FROM class_history WHERE ended_at IS NULL"
+                )
+            }
+
+            changes = 0
+            for key, course in courses.items():
+                hash_ = _hash(course.code, course.title)
+                if current_courses.pop(key, None) != hash_:
+                    self._end("course_history", "course_key = ?", (key,), now, last_seen)
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO course_content VALUES (?, ?, ?)",
+                        (hash_, course.code, course.title),
+                    )
+                    self.conn.execute(
+                        "INSERT INTO course_history (course_key, hash, first_seen)"
+                        " VALUES (?, ?, ?)",
+                        (key, hash_, now),
+                    )
+                    changes += 1
+
+                for class_key, section in course.classes.items():
+                    fields = _fields(section)
+                    hash_ = _hash(*fields)
+                    if current_classes.pop((key, class_key), None) == hash_:
+                        continue
+                    self._end(
+                        "class_history",
+                        "course_key = ? AND class_key = ?",
+                        (key, class_key),
+                        now,
+                        last_seen,
+                    )
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO class_content VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (hash_, *fields),
+                    )
+                    self.conn.execute(
+                        "INSERT INTO class_history (course_key, class_key, hash, first_seen)"
+                        " VALUES (?, ?, ?, ?)",
+                        (key, class_key, hash_, now),
+                    )
+                    self._unindex_class(key, class_key)
+                    self._index_class(key, class_key, section)
+                    changes += 1
+
+            # Whatever is left was not seen in this poll
+            for key in current_courses:
+                self._end("course_history", "course_key = ?", (key,), now, last_seen)
+                changes += 1
+            for course_key, class_key in current_classes:
+                self._end(
+                    "class_history",
+                    "course_key = ? AND class_key = ?",
+                    (course_key, class_key),
+                    now,
+                    last_seen,
+                )
+                self._unindex_class(course_key, class_key)
+                changes += 1
+
+            self._add_poll(now, changes)
+        return changes
+
+    def class_history(self, course_key: str, class_key: str) -> list[ClassVersion]:
+        """All stored versions of a class, oldest first."""
+        last_polled_at = self.last_polled_at()
+        return [
+            ClassVersion(
+                section=_section(fields),
+                first_seen=first_seen,
+                last_seen=last_seen if ended_at is not None else last_polled_at,
+                ended_at=ended_at,
+            )
+            for first_seen, last_seen, ended_at, *fields in self.conn.execute(
+                "SELECT h.first_seen, h.last_seen, h.ended_at, c.name, c.language, c.period,"
+                " c.schedule, c.room, c.lecturers FROM class_history h"
+                " JOIN class_content c ON c.hash = h.hash"
+                " WHERE h.course_key = ? AND h.class_key = ? ORDER BY h.first_seen",
+                (course_key, class_key),
+            )
+        ]
+
+    def last_change(self, course_key: str, class_key: str, field: str) -> float | None:
+        """When a field of a class (e.g. "room") last changed, or None if it never did."""
+        versions = self.class_history(course_key, class_key)
+        for prev, curr in zip(reversed(versions[:-1]), reversed(versions[1:])):
+            if curr.first_seen != prev.ended_at:
+                continue  # The class was gone in between, not changed
+            if getattr(prev.section, field) != getattr(curr.section, field):
+                return curr.first_seen
+        return None
+
+    def find_classes(
+        self,
+        code: str | None = None,
+        lecturer: str | None = None,
+        room: str | None = None,
+        day: str | None = None,
+        at: str | None = None,
+    ) -> list[dict]:
+        """Current classes matching every given filter, through the lookup indexes.
+
+        `code` is an exact course code, `lecturer` a case-insensitive substring, `room` and
+        `day` exact (case-insensitive) and `at` a time such as "08.30" during a meeting.
+        """
+        sql = CURRENT_CLASSES
+        params: list[str] = []
+        if code is not None:
+            sql += (
+                " AND h.course_key IN (SELECT course_key FROM course_history WHERE ended_at IS NULL"
+                " AND hash IN (SELECT hash FROM course_content WHERE code = ?))"
+            )
+            params.append(code)
+        if lecturer is not None:
+            sql += (
+                " AND (h.course_key, h.class_key) IN"
+                " (SELECT course_key, class_key FROM class_lecturer WHERE lecturer LIKE ?)"
+            )
+            params.append(f"%{lecturer}%")
+        meeting = []
+        if room is not None:
+            meeting.append("room = ?")
+            params.append(room)
+        if day is not None:
+            meeting.append("day = ?")
+            params.append(day)
+        if at is not None:
+            meeting.append("starts <= ? AND ? < ends")
+            params += [_time(at)] * 2
+        if meeting:
+            sql += (
+                " AND (h.course_key, h.class_key) IN"
+                " (SELECT course_key, class_key FROM class_meeting WHERE "
+                + " AND ".join(meeting)
+                + ")"
+            )
+        sql += " ORDER BY h.course_key, h.id"
+        return [
+            {"course_key": course_key, "code": code, "title": title, **_class_json(fields)}
+            for course_key, code, title, *fields in self.conn.execute(sql, params)
+        ]
+
+    def room_conflicts(self) -> list[dict]:
+        """Groups of current classes that meet in the same room at overlapping times."""
+        rows = self.conn.execute(
+            "SELECT room, day, starts, ends, course_key, class_key FROM class_meeting"
+            " WHERE room != '' ORDER BY room, day, starts"
+        )
+        return [
+            {"room": room, "day": day, "classes": group} for (room, day), group in _overlaps(rows)
+        ]
+
+    def lecturer_conflicts(self) -> list[dict]:
+        """Groups of current classes taught by the same lecturer at overlapping times."""
+        rows = self.conn.execute(
+            "SELECT l.lecturer, m.day, m.starts, m.ends, m.course_key, m.class_key"
+            " FROM class_lecturer l JOIN class_meeting m USING (course_key, class_key)"
+            " ORDER BY l.lecturer, m.day, m.starts"
+        )
+        return [
+            {"lecturer": lecturer, "day": day, "classes": group}
+            for (lecturer, day), group in _overlaps(rows)
+        ]
+
+    def close(self):
+        self.conn.close()
+
+    def _index_class(self, course_key: str, class_key: str, section: ClassSection):
+        self.conn.executemany(
+            "INSERT INTO class_meeting VALUES (?, ?, ?, ?, ?, ?)",
+            [(course_key, class_key, *meeting) for meeting in _meetings(section)],
+        )
+        self.conn.executemany(
+            "INSERT INTO class_lecturer VALUES (?, ?, ?)",
+            [(course_key, class_key, lecturer) for lecturer in _lecturers(section)],
+        )
+
+    def _unindex_class(self, course_key: str, class_key: str):
+        for table in ("class_meeting", "class_lecturer"):
+            self.conn.execute(
+                f"DELETE FROM {table} WHERE course_key = ? AND class_key = ?",
+                (course_key, class_key),
+            )
+
+    def _rebuild_index(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM class_meeting")
+            self.conn.execute("DELETE FROM class_lecturer")
+            for course_key, class_key, *fields in self.conn.execute(
+                "SELECT h.course_key, h.class_key, c.name, c.language, c.period, c.schedule,"
+                " c.room, c.lecturers FROM class_history h JOIN class_content c ON c.hash = h.hash"
+                " WHERE h.ended_at IS NULL"
+            ).fetchall():
+                self._index_class(course_key, class_key, _section(fields))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('index_version', ?)",
+                (INDEX_VERSION,),
+            )
+
+    def _rekey(self):
+        """Re-key history stored by older versions under positional keys ("CODE#2").
+
+        Each course version is re-keyed from its own title. A class version follows the course
+        versions it was seen under, and is split where they got different keys, e.g. when an
+        added curriculum took over "CODE" and the class moved to "CODE#2" unchanged.
+        """
+        with self.conn:
+            courses = self.conn.execute(
+                "SELECT h.id, h.course_key, h.first_seen, h.ended_at, c.code, c.title"
+                " FROM course_history h JOIN course_content c ON c.hash = h.hash"
+                " ORDER BY h.first_seen, h.id"
+            ).fetchall()
+            classes = self.conn.execute(
+                "SELECT id, course_key, class_key, hash, first_seen, last_seen, ended_at"
+                " FROM class_history"
+            ).fetchall()
+            # Ids are unique, so the current-row indexes hold while the keys are moved
+            self.conn.execute("UPDATE course_history SET course_key = id")
+            self.conn.execute("UPDATE class_history SET course_key = id")
+
+            versions: dict[str, list[tuple[float, str]]] = defaultdict(list)
+            current: set[str] = set()
+            for id_, old_key, first_seen, ended_at, code, title in courses:
+                key = base = Course(code=code, title=title).key
+                n = 1
+                while ended_at is None and key in current:
+                    n += 1
+                    key = f"{base}#{n}"  # Numbered like `index_courses` does
+                if ended_at is None:
+                    current.add(key)
+                versions[old_key].append((first_seen, key))
+                self.conn.execute(
+                    "UPDATE course_history SET course_key = ? WHERE id = ?", (key, id_)
+                )
+
+            for id_, old_key, class_key, hash_, first_seen, last_seen, ended_at in classes:
+                segments = _segments(versions.get(old_key, []), first_seen, ended_at)
+                if not segments:
+                    segments = [(first_seen, old_key)]
+                key = segments[0][1]
+                if len(segments) == 1:
+                    self.conn.execute(
+                        "UPDATE class_history SET course_key = ? WHERE id = ?", (key, id_)
+                    )
+                    continue
+                bounds = [start for start, _ in segments[1:]]
+                self.conn.execute(
+                    "UPDATE class_history SET course_key = ?, last_seen = ?, ended_at = ?"
+                    " WHERE id = ?",
+                    (key, self._polled_before(bounds[0]), bounds[0], id_),
+                )
+                for (start, key), end in zip(segments[1:], [*bounds[1:], ended_at]):
+                    self.conn.execute(
+                        "INSERT INTO class_history"
+                        " (course_key, class_key, hash, first_seen, last_seen, ended_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            key,
+                            class_key,
+                            hash_,
+                            start,
+                            last_seen if end == ended_at else self._polled_before(end),
+                            end,
+                        ),
+                    )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('key_version', ?)",
+                (KEY_VERSION,),
+            )
+        self._rebuild_index()
+
+    def _polled_before(self, at: float) -> float | None:
+        row = self.conn.execute("SELECT MAX(polled_at) FROM polls WHERE polled_at < ?", (at,))
+        return row.fetchone()[0]
+
+    def _add_poll(self, polled_at: float, changes: int):
+        self.conn.execute(
+            "INSERT INTO polls (polled_at, changes) VALUES (?, ?)", (polled_at, changes)
+        )
+
+    def _end(self, table: str, where: str, params: tuple, now: float, last_seen: float | None):
+        self.conn.execute(
+            f"UPDATE {table} SET ended_at = ?, last_seen = ? WHERE ended_at IS NULL AND {where}",
+            (now, last_seen, *params),
+        )
+
+
+def _segments(
+    versions: list[tuple[float, str]], first_seen: float, ended_at: float | None
+) -> list[tuple[float, str]]:
+    """(start, key) of the course versions, sorted by when they were first seen, that a class
+    version seen from `first_seen` until `ended_at` belongs to. Runs of one key are merged.
+    """
+    starts = [start for start, _ in versions]
+    lo = max(bisect_right(starts, first_seen) - 1, 0)
+    hi = bisect_left(starts, math.inf if ended_at is None else ended_at)
+    segments: list[tuple[float, str]] = []
+    for start, key in versions[lo:hi]:
+        if not segments or segments[-1][1] != key:
+            segments.append((max(start, first_seen), key))
+    return segments
+
+
+def _fields(section: ClassSection) -> tuple[str, ...]:
+    return (
+        section.name,
+        section.language,
+        section.period,
+        LINE_SEP.join(section.schedule),
+        LINE_SEP.join(section.room),
+        LINE_SEP.join(section.lecturers),
+    )
+
+
+def _section(fields: list[str]) -> ClassSection:
+    name, language, period, schedule, room, lecturers = fields
+    return ClassSection(
+        name=name,
+        language=language,
+        period=period,
+        schedule=tuple(schedule.split(LINE_SEP)) if schedule else (),
+        room=tuple(room.split(LINE_SEP)) if room else (),
+        lecturers=tuple(lecturers.split(LINE_SEP)) if lecturers else (),
+    )
+
+
+def _meetings(section: ClassSection) -> list[tuple[str, str, str, str]]:
+    """(day, starts, ends, room) of each schedule line. The nth room goes with the nth line."""
+    meetings = []
+    for i, line in enumerate(section.schedule):
+        match = MEETING_RE.match(line)
+        if match is None:
+            continue
+        day, start_hour, start_minute, end_hour, end_minute = match.groups()
+        if i < len(section.room):
+            room = section.room[i]
+        else:
+            room = section.room[0] if len(section.room) == 1 else ""
+        meetings.append(
+            (
+                day,
+                f"{int(start_hour):02}.{start_minute}",
+                f"{int(end_hour):02}.{end_minute}",
+                room.strip(),
+            )
+        )
+    return meetings
+
+
+def _lecturers(section: ClassSection) -> list[str]:
+    # e.g. "- Dra. Siti, M.Kom." per line
+    return [name for line in section.lecturers if (name := line.strip().lstrip("-").strip())]
+
+
+def _time(value: str) -> str:
+    """Normalize "8:30" or "08.30" to the "08.30" of the index."""
+    hour, _, minute = value.replace(":", ".").partition(".")
+    return f"{int(hour):02}.{int(minute or 0):02}"
+
+
+def _class_json(fields: list[str]) -> dict:
+    section = _section(fields)
+    return {
+        "class": section.name,
+        "language": section.language,
+        "period": section.period,
+        "schedule": list(section.schedule),
+        "room": list(section.room),
+        "lecturers": _lecturers(section),
+    }
+
+
+def _overlaps(rows) -> Iterator[tuple[tuple[str, str], list[dict]]]:
+    """Sweep (key, day, starts, ends, course_key, class_key) rows sorted by key, day and start.
+
+    Yields each group of meetings that overlap one another, keyed by (key, day). Groups where
+    every meeting is the same class (listed under several curricula) are skipped.
+    """
+    group: list[tuple] = []
+    group_ends = ""
+
+    def conflict():
+        if len({row[5] for row in group}) > 1:
+            classes = [
+                {"course_key": course_key, "class": class_key, "starts": starts, "ends": ends}
+                for _, _, starts, ends, course_key, class_key in group
+            ]
+            yield group[0][:2], classes
+
+    for row in rows:
+        if group and row[:2] == group[0][:2] and row[2] < group_ends:
+            group.append(row)
+            group_ends = max(group_ends, row[3])
+            continue
+        yield from conflict()
+        group = [row]
+        group_ends = row[3]
+    yield from conflict()
+
+
+def _hash(*fields: str) -> str:
+    return hashlib.sha1("\x1f".join(fields).encode("utf-8")).hexdigest()
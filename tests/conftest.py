@@ -0,0 +1,33 @@
+from typing import Iterator
+
+import pytest
+
+from fazuh.warlock.bench import standin_config
+from fazuh.warlock.bench import use_standin
+from fazuh.warlock.config import Config
+from fazuh.warlock.config import ConfigSnapshot
+from fazuh.warlock.siak.path import Path
+from fazuh.warlock.standin.server import StandInServer
+
+
+@pytest.fixture
+def standin(tmp_path, monkeypatch) -> Iterator[StandInServer]:
+    """A running SIAK stand-in, with warlock pointed at it in HTTP mode.
+
+    Runs in `tmp_path`, so files warlock writes (data/, courses.json) stay out of the repo.
+    """
+    monkeypatch.chdir(tmp_path)
+    hostname = Path.HOSTNAME
+    with StandInServer(courses=20, classes=2) as server:
+        use_standin(server, "http")
+        yield server
+    Path.set_hostname(hostname)
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch) -> ConfigSnapshot:
+    """The `standin` fixture's config, for tests that make no requests. Runs in `tmp_path`."""
+    monkeypatch.chdir(tmp_path)
+    url = "http://127.0.0.1:9/"  # Discard port, nothing listens
+    Config().snapshot = standin_config(url, "user", "pass", f"{url}api/webhooks/1/standin", "http")
+    return Config().snapshot
@@ -0,0 +1,52 @@
+import asyncio
+import dataclasses
+import os
+
+from fazuh.warlock.config import Config
+from fazuh.warlock.siak.captcha import CAPTCHA_DIR
+from fazuh.warlock.siak.captcha import CaptchaSolver
+from fazuh.warlock.siak.captcha import image_key
+from fazuh.warlock.siak.captcha import StdinSolver
+
+
+def test_human_solvers_wait_at_once(config, monkeypatch):
+    monkeypatch.setattr(CaptchaSolver, "_instance", None)
+    Config().snapshot = dataclasses.replace(config, captcha_solvers=("http", "file"))
+    image = b"captcha"
+    key = image_key(image)
+
+    async def main():
+        solver = CaptchaSolver()
+        task = asyncio.create_task(solver.solve(image))
+        while not (CAPTCHA_DIR / f"{key}.png").exists():
+            await asyncio.sleep(0.01)
+        # Answered through the file while the HTTP solver, listed first, is still waiting
+        (CAPTCHA_DIR / f"{key}.txt").write_text("abc12\n")
+        try:
+            return await asyncio.wait_for(task, 5), solver.backends[0]._pending
+        finally:
+            await solver.close()
+
+    assert asyncio.run(main()) == ("abc12", {})
+    assert not (CAPTCHA_DIR / f"{key}.png").exists()
+
+
+def test_stdin_answer_reaches_the_prompt_after_a_timeout(config, monkeypatch):
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setattr("sys.stdin", os.fdopen(read_fd))
+    solver = StdinSolver()
+
+    async def main():
+        try:
+            await asyncio.wait_for(solver.solve(b"first", "first"), 0.05)
+        except TimeoutError:
+            pass
+        task = asyncio.create_task(solver.solve(b"second", "second"))
+        await asyncio.sleep(0.05)
+        os.write(write_fd, b"xyz34\n")
+        return await asyncio.wait_for(task, 5)
+
+    try:
+        assert asyncio.run(main()) == "xyz34"
+    finally:
+        os.close(write_fd)  # Ends the reader thread
@@ -0,0 +1,73 @@
+import asyncio
+import os
+
+import pytest
+
+from fazuh.warlock.config import Config
+
+UNREACHABLE = "http://127.0.0.1:9/api/webhooks/1/unreachable"
+
+
+@pytest.fixture
+def env(standin, tmp_path, monkeypatch):
+    """Writes .env in `tmp_path` for `Config`, each write newer than the last."""
+    conf = Config()
+    path = tmp_path / ".env"
+    monkeypatch.setattr(conf, "_env_file", path)
+    monkeypatch.setattr(conf, "_webhooks", {})
+    mtime = [1_000_000_000]
+
+    def write(**values: str):
+        values = {
+            "USERNAME": "user",
+            "PASSWORD": "pass",
+            "TRACKED_URL": f"{standin.url}main/Schedule/",
+            "TRACKER_DISCORD_WEBHOOK_URL": standin.webhook_url,
+            **values,
+        }
+        path.write_text("".join(f"{name}={value}\n" for name, value in values.items()))
+        mtime[0] += 1
+        os.utime(path, (mtime[0], mtime[0]))
+
+    write()
+    conf.load()
+    return write
+
+
+def test_validate(env):
+    assert asyncio.run(Config().validate())
+
+
+def test_validate_unreachable_webhook(env):
+    env(TRACKER_DISCORD_WEBHOOK_URL=UNREACHABLE)
+    Config().load()
+
+    assert not asyncio.run(Config().validate())
+
+
+def test_refresh(env):
+    env(TRACKER_INTERVAL="300")
+
+    assert asyncio.run(Config().refresh()).tracker_interval == 300
+
+
+def test_refresh_keeps_snapshot_on_invalid_number(env):
+    env(TRACKER_INTERVAL="300")
+    asyncio.run(Config().refresh())
+    env(TRACKER_INTERVAL="20m")
+
+    assert asyncio.run(Config().refresh()).tracker_interval == 300
+
+
+def test_refresh_retries_rejected_webhook(env, monkeypatch):
+    conf = Config()
+    env(TRACKER_INTERVAL="300")
+    valid = conf._validate
+
+    async def unreachable(snapshot):
+        return False
+
+    monkeypatch.setattr(conf, "_validate", unreachable)
+    assert asyncio.run(conf.refresh()).tracker_interval == 1200
+    monkeypatch.setattr(conf, "_validate", valid)
+    assert asyncio.run(conf.refresh()).tracker_interval == 300
@@ -0,0 +1,43 @@
+from fazuh.warlock.siak.course_plan import match_courses
+from fazuh.warlock.siak.course_plan import parse_course_plan
+from fazuh.warlock.standin import pages
+
+URL = "https://academic.ui.ac.id/main/CoursePlan/CoursePlanEdit"
+
+
+def test_parse_course_plan():
+    form = parse_course_plan(pages.course_plan_page(courses=3, classes=2), URL)
+
+    assert form is not None
+    assert form.action == "https://academic.ui.ac.id/main/CoursePlan/CoursePlanSave"
+    assert form.fields == [("tokens", "1234567890")]
+    assert form.submit == ("submit", "Simpan IRS")
+    assert [row.course for row in form.rows] == [
+        f"Mata Kuliah {c} ({k})" for c in range(3) for k in "AB"
+    ]
+    assert form.rows[3].prof == "- Dosen 1-1 - Asisten 1-1"
+    assert form.rows[3].radio_name == "c[CSGE600001_01.00.12.01-2020]"
+    assert form.rows[3].radio_value == "700003-4"
+
+
+def test_parse_course_plan_unrecognized_shape():
+    assert parse_course_plan(pages.welcome_page("user"), URL) is None
+    assert parse_course_plan(pages.registration_closed_page(), URL) is None
+    # The submit button outside of a POST form is not a form that can be submitted
+    content = pages.course_plan_page(courses=1, classes=1).replace('method="post"', 'method="get"')
+    assert parse_course_plan(content, URL) is None
+
+
+def test_course_plan_payload():
+    form = parse_course_plan(pages.course_plan_page(courses=3, classes=2), URL)
+    selected, missing = match_courses(
+        form.rows, {"Mata Kuliah 0": "Dosen 0-1", "Mata Kuliah 2": "Dosen 2-0", "Kalkulus": "X"}
+    )
+
+    assert missing == {"Kalkulus": "X"}
+    assert form.payload(selected) == [
+        ("tokens", "1234567890"),
+        ("c[CSGE600000_01.00.12.01-2020]", "700001-4"),
+        ("c[CSGE600002_01.00.12.01-2020]", "700004-4"),
+        ("submit", "Simpan IRS"),
+    ]
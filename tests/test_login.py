@@ -0,0 +1,59 @@
+import asyncio
+
+from fazuh.warlock.siak.login_form import parse_login_form
+from fazuh.warlock.siak.page_state import PageState
+from fazuh.warlock.siak.path import Path
+from fazuh.warlock.siak.siak import SESSION_COOKIE
+from fazuh.warlock.siak.siak import Siak
+from fazuh.warlock.standin import pages
+
+
+def login(username: str, password: str) -> tuple[PageState | None, bool]:
+    """Log in over HTTP. Returns the resulting state and whether the session cookie was set."""
+
+    async def main():
+        siak = Siak(username, password)
+        try:
+            state = await siak._login_http()
+            return state, siak.client.cookies.get(SESSION_COOKIE) is not None
+        finally:
+            await siak.close()
+
+    return asyncio.run(main())
+
+
+def test_login_http(standin):
+    assert login(standin.username, standin.password) == (PageState.OK, True)
+    assert len(standin.sessions) == 1
+
+
+def test_login_http_wrong_password(standin):
+    assert login(standin.username, "wrong") == (PageState.LOGIN, False)
+    assert standin.sessions == set()
+
+
+def test_login_http_captcha_needs_browser(standin):
+    standin.captcha = True
+
+    assert login(standin.username, standin.password) == (None, False)
+
+
+def test_login_http_high_load(standin):
+    standin.state = "high_load"
+
+    assert login(standin.username, standin.password) == (PageState.HIGH_LOAD, False)
+
+
+def test_parse_login_form():
+    form = parse_login_form(pages.login_page(), Path.AUTHENTICATION)
+
+    assert form is not None
+    assert form.action == f"{Path.HOSTNAME}main/Authentication/Index"
+    assert form.payload("user", "pass") == [("u", "user"), ("p", "pass")]
+
+
+def test_parse_login_form_unknown_form():
+    assert parse_login_form(pages.welcome_page("user"), Path.AUTHENTICATION) is None
+    # A form without the password field is not the login form
+    content = pages.login_page().replace('name="p"', 'name="password"')
+    assert parse_login_form(content, Path.AUTHENTICATION) is None
@@ -0,0 +1,67 @@
+from fazuh.warlock.siak.schedule import ClassSection
+from fazuh.warlock.siak.schedule import Course
+from fazuh.warlock.siak.schedule import diff_courses
+from fazuh.warlock.siak.schedule import index_courses
+from fazuh.warlock.siak.schedule_parser import parse_courses
+from fazuh.warlock.standin import pages
+
+
+def test_added_curriculum_keeps_other_keys():
+    old = parse_courses(pages.schedule_page(2, 1))
+    added = parse_courses(pages.schedule_page(3, 1))[2]
+    added.title = added.title.replace(added.code, old[0].code)
+    added.code = old[0].code
+    added.title = added.title.rsplit("; ", 1)[0] + "; Kurikulum 01.00.12.01-2016"
+
+    changes = diff_courses(index_courses(old), index_courses([added, *old]))
+    assert changes == [f"+ {added.to_line()}"]
+
+
+def section(name: str, room: str = "D.109", lecturers: tuple[str, ...] = ("- Dra. Ika",)):
+    return ClassSection(
+        name=name,
+        language="Indonesia",
+        period="25/08/2025 - 19/12/2025",
+        schedule=("Rabu, 08.00-09.40",),
+        room=(room,),
+        lecturers=lecturers,
+    )
+
+
+def test_diff_lists_changed_fields():
+    title = "CSGE601020 - Dasar-Dasar Pemrograman 1 (4 SKS, Term 1); Kurikulum 2020"
+    old = index_courses(
+        [
+            Course.from_header(title, [section("Kelas A"), section("Kelas B")]),
+            Course.from_header("CSGE601021 - Matematika Diskret 1; Kurikulum 2020", []),
+        ]
+    )
+    new = index_courses(
+        [
+            Course.from_header(
+                title.replace("Term 1", "Term 2"),
+                [
+                    section("Kelas A", room="D.201", lecturers=("- Dra. Ika", "- Budi")),
+                    section("Kelas C"),
+                ],
+            ),
+            Course.from_header("CSGE601022 - Struktur Data; Kurikulum 2020", []),
+        ]
+    )
+    assert diff_courses(old, new) == [
+        f"@@ {title.replace('Term 1', 'Term 2')} @@",
+        f"~ {title} → {title.replace('Term 1', 'Term 2')}",
+        "~ Kelas A: room D.109 → D.201; lecturers - Dra. Ika → - Dra. Ika, - Budi",
+        f"- {section('Kelas B').to_line()}",
+        f"+ {section('Kelas C').to_line()}",
+        "- CSGE601021 - Matematika Diskret 1; Kurikulum 2020",
+        "+ CSGE601022 - Struktur Data; Kurikulum 2020",
+    ]
+
+
+def test_diff_ignores_line_breaks_lost_in_the_line_format():
+    title = "CSGE601020 - Dasar-Dasar Pemrograman 1 (4 SKS, Term 1); Kurikulum 2020"
+    course = Course.from_header(title, [section("Kelas A", lecturers=("- Dra. Ika", "- Budi"))])
+    restored = Course.from_line(course.to_line())
+    assert restored.classes["Kelas A"].lecturers == ("- Dra. Ika- Budi",)
+    assert diff_courses(index_courses([course]), index_courses([restored])) == []
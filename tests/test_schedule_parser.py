@@ -0,0 +1,48 @@
+import pytest
+
+from fazuh.warlock.siak.schedule_parser import parse_courses
+from fazuh.warlock.siak.schedule_parser import parse_schedule
+from fazuh.warlock.siak.schedule_parser import parse_schedule_soup
+from fazuh.warlock.standin import pages
+
+HEADER = (
+    '<tr><th colspan="7" class="sub border2 pad2">'
+    "<strong>CSGE601020 - Dasar-Dasar Pemrograman 1 (4 SKS, Term 1)</strong>;"
+    " Kurikulum 01.00.12.01-2020</th></tr>"
+)
+ROW = (
+    '<tr><td class="ce">1</td><td>Kelas DDP 1 (A)</td><td>Indonesia</td>'
+    "<td>25/08/2025 - 19/12/2025</td><td>Rabu, 08.00-09.40</td><td>D.109</td>"
+    "<td>- Dra. Ika</td></tr>"
+)
+
+
+def table(*rows: str) -> str:
+    return pages.page(
+        "Jadwal Kuliah", '<table class="box"><tbody>' + "".join(rows) + "</tbody></table>"
+    )
+
+
+PAGES = {
+    "schedule": pages.schedule_page(5, 3),
+    "empty": pages.schedule_page(0, 0),
+    "no classes": table(HEADER, HEADER.replace("CSGE601020", "CSGE601021")),
+    "unclosed td": table(HEADER, ROW.replace("</td>", ""), ROW),
+    "nested table": table(
+        HEADER,
+        ROW.replace("<td>D.109</td>", "<td><table><tr><td>D.109</td></tr></table></td>"),
+        ROW,
+    ),
+    "comment in cell": table(HEADER, ROW.replace("D.109", "D.<!-- was D.108 -->109")),
+    "two headers in a row": table(
+        HEADER.replace("</th></tr>", "</th>" + HEADER[4:]),
+        ROW,
+    ),
+}
+
+
+@pytest.mark.parametrize("content", PAGES.values(), ids=PAGES.keys())
+def test_matches_soup(content):
+    expected = parse_schedule_soup(content)
+    assert parse_schedule(content) == expected
+    assert [course.to_line() for course in parse_courses(content)] == expected
@@ -0,0 +1,84 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from fazuh.warlock.module.schedule_update_tracker import ScheculeUpdateTracker
+from fazuh.warlock.scheduler import PollScheduler
+from fazuh.warlock.siak.session import SiakSession
+from fazuh.warlock.siak.siak import Siak
+from fazuh.warlock.standin import pages
+
+
+class FakePage:
+    """A browser tab that shows `content` at whatever URL it is sent to."""
+
+    def __init__(self, content: str):
+        self.url = None
+        self._content = content
+
+    async def goto(self, url: str):
+        self.url = url
+
+    async def content(self) -> str:
+        return self._content
+
+
+def check_in_browser(standin, content: str) -> tuple[bool | None, int]:
+    """Check the tracked URL in browser mode on a tab showing `content`.
+
+    Returns the result and how many courses the store holds after.
+    """
+
+    async def main():
+        siak = Siak(standin.username, standin.password)
+        tracker = ScheculeUpdateTracker(SiakSession(siak))
+        tracker.fetch_mode = "browser"
+        tracker.siak = siak
+
+        @asynccontextmanager
+        async def tab():
+            yield FakePage(content)
+
+        siak.tab = tab
+        view = next(iter(tracker.views.values()))
+        try:
+            return await tracker.check(view), len(view.store.latest())
+        finally:
+            view.store.close()
+            await siak.close()
+
+    return asyncio.run(main())
+
+
+def test_browser_check_records_schedule(standin):
+    assert check_in_browser(standin, pages.schedule_page(3, 2)) == (True, 3)
+
+
+@pytest.mark.parametrize(
+    "page", [pages.high_load_page, pages.inaccessible_page, pages.rejected_page]
+)
+def test_browser_check_skips_overload_pages(standin, page):
+    assert check_in_browser(standin, page()) == (None, 0)
+
+
+def test_server_error_counts_as_overload(standin):
+    standin.state = "unavailable"
+
+    async def main():
+        siak = Siak(standin.username, standin.password)
+        siak.client.cookies.set("siakng_cc", "x")  # Skip logging in, which would fail too
+        tracker = ScheculeUpdateTracker(SiakSession(siak))
+        tracker.fetch_mode = "http"
+        tracker.siak = siak
+        try:
+            return await tracker.run()
+        finally:
+            for view in tracker.views.values():
+                view.store.close()
+            await siak.close()
+
+    scheduler = PollScheduler("test")
+    assert asyncio.run(main()) is None
+    scheduler.record()
+    assert scheduler.overloads == 1
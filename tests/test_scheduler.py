@@ -0,0 +1,42 @@
+import asyncio
+
+import httpx
+
+from fazuh.warlock.module.schedule_update_tracker import ScheculeUpdateTracker
+from fazuh.warlock.scheduler import PollScheduler
+from fazuh.warlock.siak.session import SiakSession
+from fazuh.warlock.siak.siak import Siak
+
+
+def test_unchanged_polls_lengthen_interval(config):
+    scheduler = PollScheduler("test")
+    for _ in range(10):
+        scheduler.record(False)
+
+    assert scheduler.change_rate < 0.05
+    assert scheduler.next_delay(100) > 150
+
+
+def test_not_modified_counts_as_unchanged(config, monkeypatch):
+    async def main():
+        siak = Siak(config.username, config.password)
+        tracker = ScheculeUpdateTracker(SiakSession(siak))
+        tracker.fetch_mode = "http"
+        tracker.siak = siak
+
+        async def fetch(url, headers=None):
+            return httpx.Response(304, request=httpx.Request("GET", url))
+
+        monkeypatch.setattr(siak, "fetch", fetch)
+        try:
+            return await tracker.run()
+        finally:
+            for view in tracker.views.values():
+                view.store.close()
+            await siak.close()
+
+    changed = asyncio.run(main())
+    assert changed is False  # Not None, which would leave the change rate as it was
+    scheduler = PollScheduler("test")
+    scheduler.record(changed)
+    assert scheduler.change_rate < 0.5
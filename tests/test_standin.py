@@ -0,0 +1,29 @@
+import httpx
+import pytest
+
+from fazuh.warlock.siak.page_state import classify
+from fazuh.warlock.siak.page_state import PageState
+from fazuh.warlock.siak.path import Path
+
+
+def test_redirects_to_login_without_session(standin):
+    resp = httpx.get(Path.WELCOME, follow_redirects=True)
+
+    assert str(resp.url) == Path.AUTHENTICATION
+    assert classify(resp.text, str(resp.url)) is PageState.LOGIN
+
+
+@pytest.mark.parametrize(
+    ("state", "expected"),
+    [
+        ("high_load", PageState.HIGH_LOAD),
+        ("inaccessible", PageState.INACCESSIBLE),
+        ("rejected", PageState.REJECTED),
+    ],
+)
+def test_overloaded_pages_are_classified(standin, state, expected):
+    standin.state = state
+
+    resp = httpx.get(Path.AUTHENTICATION)
+
+    assert classify(resp.text, str(resp.url)) is expected
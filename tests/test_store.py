@@ -0,0 +1,95 @@
+from fazuh.warlock.siak.schedule import ClassSection
+from fazuh.warlock.siak.schedule import Course
+from fazuh.warlock.siak.schedule import index_courses
+from fazuh.warlock.store import ScheduleStore
+
+
+def course(curriculum: str, room: str = "D.109") -> Course:
+    title = f"CSGE601020 - Dasar-Dasar Pemrograman 1 (4 SKS, Term 1); Kurikulum {curriculum}"
+    section = ClassSection(
+        name="Kelas DDP 1 (A)",
+        language="Indonesia",
+        period="25/08/2025 - 19/12/2025",
+        schedule=("Rabu, 08.00-09.40",),
+        room=(room,),
+        lecturers=("- Dra. Ika",),
+    )
+    return Course.from_header(title, [section])
+
+
+def test_rekeys_positional_history(tmp_path):
+    path = tmp_path / "schedule.db"
+    store = ScheduleStore(path)
+    # Keyed by position as older versions did, so adding a curriculum shifted the others
+    store.record({"CSGE601020": course("2020"), "CSGE601020#2": course("2024")}, 1.0)
+    store.record(
+        {
+            "CSGE601020": course("2016"),
+            "CSGE601020#2": course("2020"),
+            "CSGE601020#3": course("2024", room="D.201"),
+        },
+        2.0,
+    )
+    store.set_meta(key_version=None)
+    store.close()
+
+    store = ScheduleStore(path)
+    curr = index_courses([course("2016"), course("2020"), course("2024", room="D.201")])
+    assert store.latest() == curr
+    assert store.record(curr, 3.0) == 0
+    # The 2024 class is followed across its move from "CSGE601020#2" to "CSGE601020#3"
+    key = "CSGE601020; Kurikulum 2024"
+    assert store.last_change(key, "Kelas DDP 1 (A)", "room") == 2.0
+    assert len(store.find_classes(room="D.201")) == 1
+    store.close()
+
+
+def test_latest_returns_what_was_recorded(tmp_path):
+    store = ScheduleStore(tmp_path / "schedule.db")
+    courses = index_courses([course("2016"), course("2020")])
+    # Multi-line cells keep one entry per line
+    courses["CSGE601020; Kurikulum 2020"].classes["Kelas DDP 1 (B)"] = ClassSection(
+        name="Kelas DDP 1 (B)",
+        schedule=("Senin, 08.00-09.40", "Rabu, 10.00-11.40"),
+        room=("D.109", "D.201"),
+        lecturers=("- Dra. Ika", "- Budi"),
+    )
+    store.record(courses, 1.0)
+    assert store.latest() == courses
+    store.close()
+
+
+def test_unchanged_poll_writes_no_rows(tmp_path):
+    store = ScheduleStore(tmp_path / "schedule.db")
+    courses = index_courses([course("2020")])
+    assert store.record(courses, 1.0) == 2
+    assert store.record(index_courses([course("2020")]), 2.0) == 0
+    store.touch(3.0)
+
+    [version] = store.class_history("CSGE601020; Kurikulum 2020", "Kelas DDP 1 (A)")
+    assert (version.first_seen, version.last_seen, version.ended_at) == (1.0, 3.0, None)
+    assert store.conn.execute("SELECT COUNT(*) FROM course_history").fetchone() == (1,)
+    assert store.conn.execute("SELECT COUNT(*) FROM polls").fetchone() == (3,)
+    assert store.last_polled_at() == 3.0
+    store.close()
+
+
+def test_last_change_skips_a_gap(tmp_path):
+    store = ScheduleStore(tmp_path / "schedule.db")
+    key = "CSGE601020; Kurikulum 2020"
+    store.record(index_courses([course("2020", room="D.109")]), 1.0)
+    store.record({}, 2.0)
+    # Back in another room. It was gone in between, so the room did not change.
+    store.record(index_courses([course("2020", room="D.201")]), 3.0)
+    assert store.last_change(key, "Kelas DDP 1 (A)", "room") is None
+
+    store.record(index_courses([course("2020", room="D.301")]), 4.0)
+    assert store.last_change(key, "Kelas DDP 1 (A)", "room") == 4.0
+    assert store.last_change(key, "Kelas DDP 1 (A)", "lecturers") is None
+    versions = store.class_history(key, "Kelas DDP 1 (A)")
+    assert [(v.first_seen, v.last_seen, v.ended_at) for v in versions] == [
+        (1.0, 1.0, 2.0),
+        (3.0, 3.0, 4.0),
+        (4.0, 4.0, None),
+    ]
+    store.close()
@@ -0,0 +1,89 @@
+import asyncio
+import dataclasses
+import time
+
+import pytest
+
+from fazuh.warlock.config import Config
+from fazuh.warlock.module.war_bot import WarBot
+from fazuh.warlock.siak.path import Path
+from fazuh.warlock.siak.session import SiakSession
+from fazuh.warlock.siak.siak import Siak
+
+
+def submit(standin, before_submit=lambda: None) -> bool:
+    """Log in, fetch the IRS form and submit it over HTTP, calling `before_submit` in between."""
+
+    async def main():
+        siak = Siak(standin.username, standin.password)
+        try:
+            assert await siak.authenticate()
+            bot = WarBot(SiakSession(siak))
+            bot.siak = siak
+            resp = await siak.fetch(Path.COURSE_PLAN_EDIT)
+            before_submit()
+            return await bot.submit_http(resp, time.perf_counter())
+        finally:
+            await siak.close()
+
+    return asyncio.run(main())
+
+
+def test_submit_http(standin, tmp_path):
+    (tmp_path / "courses.json").write_text("{}")
+
+    assert submit(standin)
+    assert len(standin.submissions) == 1
+    selected = [name for name, _ in standin.submissions[0] if name.startswith("c[")]
+    assert selected == ["c[CSGE600000_01.00.12.01-2020]", "c[CSGE600005_01.00.12.01-2020]"]
+
+
+def test_submit_http_redirected_to_summary(standin, tmp_path):
+    (tmp_path / "courses.json").write_text("{}")
+    standin.save_redirects = True
+
+    assert submit(standin)
+    assert len(standin.submissions) == 1
+
+
+def test_submit_http_expired_session(standin, tmp_path):
+    (tmp_path / "courses.json").write_text("{}")
+
+    assert not submit(standin, standin.expire_sessions)
+    assert standin.submissions == []
+
+
+def test_submit_http_high_load(standin, tmp_path):
+    (tmp_path / "courses.json").write_text("{}")
+
+    def overload():
+        standin.state = "high_load"
+
+    assert not submit(standin, overload)
+    assert standin.submissions == []
+
+
+@pytest.mark.parametrize("state", ["high_load", "unavailable"])
+def test_probe_backs_off_and_gives_up(standin, tmp_path, state):
+    (tmp_path / "courses.json").write_text("{}")
+    conf = Config()
+    conf.snapshot = dataclasses.replace(
+        conf.snapshot, warbot_probe_interval=0.1, warbot_probe_window=1
+    )
+
+    async def main():
+        siak = Siak(standin.username, standin.password)
+        try:
+            assert await siak.authenticate()
+            bot = WarBot(SiakSession(siak))
+            bot.siak = siak
+            standin.state = state
+            requests = standin.requests
+            done = await bot._probe(siak.clock.now())
+            return done, standin.requests - requests
+        finally:
+            await siak.close()
+
+    done, probes = asyncio.run(main())
+    assert not done
+    assert probes <= 5  # About 10 without backing off